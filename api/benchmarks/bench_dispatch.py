@@ -0,0 +1,83 @@
+"""Compare proxy latency of loopback HTTP forwarding vs in-process "self" dispatch.
+
+Starts the API on a local port with a SQLite tenant seeded into the Vault cache,
+then times /proxy/health_check in both SELF_DISPATCH_MODE values.
+
+Run from api/:  python benchmarks/bench_dispatch.py --requests 500
+"""
+import argparse
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _run(client: httpx.Client, url: str, payload: dict, n: int) -> list:
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = client.post(url, json=payload)
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    port = _free_port()
+    os.environ["SELF_API_URL"] = f"http://127.0.0.1:{port}"
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    import main as api
+    from settings import PROXY_TARGETS
+
+    PROXY_TARGETS["self"] = os.environ["SELF_API_URL"]
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    api.proxy_service.vault_cache.put(
+        "bench-uuid", ({"type": "sqlite", "database": db_path}, f"sqlite:///{db_path}")
+    )
+
+    server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    url = f"http://127.0.0.1:{port}/proxy/health_check"
+    payload = {"uuid": "bench-uuid", "name": "bench"}
+    try:
+        with httpx.Client() as client:
+            for mode in ("http", "inprocess"):
+                api.proxy_service.self_dispatch_mode = mode
+                _run(client, url, payload, 20)  # warm up pools
+                timings = _run(client, url, payload, args.requests)
+                timings.sort()
+                print(
+                    f"{mode:>10}: p50={statistics.median(timings):.2f}ms "
+                    f"p95={timings[int(len(timings) * 0.95) - 1]:.2f}ms "
+                    f"mean={statistics.mean(timings):.2f}ms"
+                )
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
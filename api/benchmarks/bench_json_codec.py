@@ -0,0 +1,84 @@
+"""Compare response encoding: jsonable_encoder + json.dumps vs codec.dumps.
+
+Builds a /query_sql-shaped payload with rows of Decimal, datetime, date, bytes
+and string columns (what DB drivers hand back) and times the previous
+``JSONResponse`` path against ``FastJSONResponse`` / ``codec.dumps``.
+
+Run from api/:  python benchmarks/bench_json_codec.py --rows 50000
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+import codec  # noqa: E402
+
+
+def _payload(rows: int) -> dict:
+    started = datetime(2024, 1, 1, 12, 0, 0)
+    result = [
+        {
+            "id": i,
+            "amount": Decimal(f"{i}.{i % 100:02d}"),
+            "quantity": Decimal(i % 1000),
+            "created_at": started + timedelta(seconds=i),
+            "day": date(2024, 1, 1) + timedelta(days=i % 365),
+            "name": f"customer-{i}",
+            "note": None if i % 3 else "ok",
+            "blob": bytes([i % 256]) * 16,
+        }
+        for i in range(rows)
+    ]
+    return {
+        "success": True,
+        "total_queries": 1,
+        "results": [{"query_index": 1, "sql": "SELECT ...", "result": result, "row_count": rows}],
+    }
+
+
+def _stdlib(payload: dict) -> bytes:
+    # what JSONResponse did before: jsonable_encoder, then json.dumps
+    return json.dumps(jsonable_encoder(payload, custom_encoder={bytes: codec.json_default}),
+                      ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _time(fn, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = _payload(args.rows)
+    print(f"rows={args.rows} orjson={'yes' if codec.orjson is not None else 'no (stdlib fallback)'} "
+          f"bytes={len(codec.dumps(payload))}")
+
+    encoded = codec.dumps(payload)
+    for label, fn in (
+        ("jsonable_encoder + json.dumps", lambda: _stdlib(payload)),
+        ("codec.dumps", lambda: codec.dumps(payload)),
+        ("codec.loads", lambda: codec.loads(encoded)),
+    ):
+        timings = _time(fn, args.runs)
+        print(f"{label:32s} median={statistics.median(timings):9.1f} ms  min={min(timings):9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare MongoDB list_tables: serial collStats per collection vs concurrent $collStats.
+
+Seeds a scratch database with N small collections, then times the old serial
+loop (fresh client + one collStats command per collection) against
+queries/mongoDB/list_table.py with its shared client and bounded parallelism.
+
+Run from api/:  python benchmarks/bench_mongo_list_tables.py --uri mongodb://localhost:27017 --collections 300
+"""
+import argparse
+import importlib.util
+import os
+import statistics
+import sys
+import time
+
+from pymongo import MongoClient
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+
+def _load_adapter():
+    path = os.path.join(API_DIR, "queries", "mongoDB", "list_table.py")
+    spec = importlib.util.spec_from_file_location("mongo_list_table", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _serial(uri: str, db_name: str) -> int:
+    client = MongoClient(uri)
+    try:
+        db = client[db_name]
+        return len([db.command("collStats", name) for name in db.list_collection_names()])
+    finally:
+        client.close()
+
+
+def _time(fn, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db", default="bench_list_tables")
+    parser.add_argument("--collections", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--parallelism", type=int, default=8)
+    args = parser.parse_args()
+
+    seed = MongoClient(args.uri)
+    seed.drop_database(args.db)
+    db = seed[args.db]
+    for i in range(args.collections):
+        db[f"c{i:04d}"].insert_many([{"n": n, "payload": "x" * 64} for n in range(10)])
+
+    adapter = _load_adapter()
+    try:
+        result = adapter.list_tables(args.uri, args.db, args.parallelism)  # warm up the shared client
+        assert isinstance(result, list) and len(result) == args.collections, result
+        for label, fn in (
+            ("serial", lambda: _serial(args.uri, args.db)),
+            (f"parallel x{args.parallelism}", lambda: adapter.list_tables(args.uri, args.db, args.parallelism)),
+        ):
+            timings = _time(fn, args.runs)
+            print(f"{label:>12}: median={statistics.median(timings):.1f}ms "
+                  f"min={min(timings):.1f}ms ({args.collections} collections)")
+    finally:
+        seed.drop_database(args.db)
+        seed.close()
+
+
+if __name__ == "__main__":
+    main()
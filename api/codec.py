@@ -0,0 +1,103 @@
+import base64
+import json
+import logging
+import uuid
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Mapping, Optional
+
+from fastapi.responses import JSONResponse
+from starlette.background import BackgroundTask
+
+from metrics import phase
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+_ORJSON_OPTIONS = 0 if orjson is None else orjson.OPT_NON_STR_KEYS
+
+
+def json_default(value: Any) -> Any:
+    """Encode DB values the JSON encoder does not know natively"""
+    if isinstance(value, Decimal):
+        # like jsonable_encoder: integral decimals as int, the rest as float
+        return int(value) if value.is_finite() and value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=json_default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits; the stdlib encoder handles those
+            pass
+    return json.dumps(obj, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the codec, skipping ``jsonable_encoder``.
+
+    The body is rendered lazily, on first access (normally when the response
+    is sent). In-process callers (the proxy) take the original object from
+    ``payload`` and the headers given from ``extra_headers``, so a result
+    wrapped into the proxy envelope is encoded once, not twice.
+    """
+
+    def __init__(self, content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None,
+                 media_type: Optional[str] = None, background: Optional[BackgroundTask] = None):
+        self.payload = content
+        self.extra_headers = dict(headers or {})
+        self.status_code = status_code
+        if media_type is not None:
+            self.media_type = media_type
+        self.background = background
+        self._body: Optional[bytes] = None
+        self._raw_headers: Optional[list] = None
+
+    @property
+    def body(self) -> bytes:
+        if self._body is None:
+            self._body = self.render(self.payload)
+        return self._body
+
+    @body.setter
+    def body(self, value: bytes) -> None:
+        self._body = value
+
+    @property
+    def raw_headers(self) -> list:
+        if self._raw_headers is None:
+            # content-length needs the body, so headers are built lazily too
+            self.init_headers(self.extra_headers or None)
+        return self._raw_headers
+
+    @raw_headers.setter
+    def raw_headers(self, value: list) -> None:
+        self._raw_headers = value
+
+    def render(self, content: Any) -> bytes:
+        # JSON encoding of the body is the larger part of serializing a result
+        with phase("serialize"):
+            return dumps(content)
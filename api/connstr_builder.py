@@ -2,8 +2,9 @@ from typing import Dict, Any
 from models import DatabaseType
 import logging
 from fastapi import HTTPException
-from sqlalchemy import create_engine, URL
+from sqlalchemy import URL
 from sqlalchemy.engine import Engine
+from engine_registry import engine_registry
 from datetime import datetime
 from urllib.parse import quote_plus
 logger = logging.getLogger(__name__)
@@ -39,10 +40,10 @@ class ConnectionStringBuilder:
             raise HTTPException(status_code=500, detail="Failed to generate connection string")
     
     def create_engine_from_config(self, db_config: Dict[str, Any]) -> Engine:
-        """Create SQLAlchemy Engine from config"""
+        """Get pooled SQLAlchemy Engine for config from the engine registry"""
         try:
             connection_string = self.generate_connection_string(db_config)
-            return create_engine(connection_string, echo=False)
+            return engine_registry.get_engine(connection_string)
         except Exception as e:
             logger.error(f"Error creating engine: {str(e)}")
             raise HTTPException(status_code=500, detail="Failed to create database engine")
@@ -0,0 +1,358 @@
+import asyncio
+import contextvars
+import importlib.util
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from sqlalchemy.engine import Connection, make_url
+
+from engine_registry import engine_registry
+from metrics import db_cancellations, db_connect_wait, db_errors, db_queue_wait, observe_phase, set_db_type
+from query_guard import QueryGuard, QueryTimeout
+from settings import (
+    DB_ASYNC_DRIVERS,
+    DB_CONCURRENCY_DEFAULT,
+    DB_CONCURRENCY_LIMITS,
+    DB_EXECUTOR_MAX_WORKERS,
+    QUERY_CANCEL_GRACE,
+    QUERY_STREAM_BUFFER,
+)
+from target_limiter import TargetCall, target_limiter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# backend name -> (async driver name, module that must be importable)
+ASYNC_DRIVERS = {
+    "mysql": ("asyncmy", "asyncmy"),
+    "postgresql": ("asyncpg", "asyncpg"),
+    "sqlite": ("aiosqlite", "aiosqlite"),
+}
+
+
+class StreamClosed(Exception):
+    """Raised inside a stream producer once the consumer has gone away"""
+
+
+class _DialectStats:
+    __slots__ = ("dialect", "executions", "errors", "timeouts", "cancellations", "waiting", "active",
+                 "wait_total", "wait_max")
+
+    def __init__(self, dialect: str):
+        self.dialect = dialect
+        self.executions = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancellations = 0
+        self.waiting = 0
+        self.active = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class DatabaseExecutor:
+    """Run blocking SQLAlchemy work without stalling the event loop.
+
+    ``work`` is a plain sync callable taking a ``Connection``. Dialects with an
+    installed async driver run it through ``AsyncConnection.run_sync`` on an
+    async engine; everything else (pyodbc, cx_Oracle, ...) runs on a bounded
+    thread pool. Each dialect has its own concurrency limit, and the time spent
+    waiting for a slot is recorded as queue wait.
+
+    Work passed to ``run`` / ``stream`` is guarded (see ``QueryGuard``): when
+    ``timeout_ms`` passes or the awaiting task is cancelled (client gone), the
+    statement is cancelled on the server rather than left running. Work for a
+    known target also goes through its adaptive limiter / circuit breaker.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DB_EXECUTOR_MAX_WORKERS,
+        default_limit: int = DB_CONCURRENCY_DEFAULT,
+        limits: Optional[Dict[str, int]] = None,
+        async_drivers: str = DB_ASYNC_DRIVERS,
+        cancel_grace: float = QUERY_CANCEL_GRACE,
+    ):
+        self.max_workers = max_workers
+        self.cancel_grace = cancel_grace
+        self.default_limit = default_limit
+        self.limits = dict(DB_CONCURRENCY_LIMITS if limits is None else limits)
+        self.async_drivers = async_drivers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-exec")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, _DialectStats] = {}
+        self._async_available: Dict[str, bool] = {}
+
+    async def run(self, connection_string: str, work: Callable[[Connection], T],
+                  timeout_ms: Optional[int] = None) -> T:
+        """Execute ``work(conn)`` against the pooled engine of a connection string"""
+        url = make_url(connection_string)
+        dialect = url.get_backend_name()
+        async_url = self._async_url(url)
+        guard = QueryGuard(connection_string, timeout_ms)
+        work = guard.wrap(work)
+
+        queued_at = time.perf_counter()
+        async with target_limiter.acquire(connection_string) as call, self._slot(dialect) as stats:
+            if async_url is not None:
+                self._record_wait(stats, queued_at)
+                engine = engine_registry.get_async_engine(async_url)
+                connecting = time.perf_counter()
+                async with engine.connect() as conn:
+                    started = time.perf_counter()
+                    call.start()
+                    db_connect_wait.observe(started - connecting, db_type=dialect)
+                    try:
+                        return await self._supervise(conn.run_sync(work), guard, stats)
+                    finally:
+                        observe_phase("db_execute", time.perf_counter() - started, dialect)
+
+            return await self._supervise(
+                self._in_thread(self._run_sync, connection_string, work, stats, queued_at, call), guard, stats
+            )
+
+    async def run_blocking(self, dialect: str, fn: Callable[..., T], *args: Any, target: Optional[str] = None) -> T:
+        """Run an arbitrary blocking callable on the thread pool under a dialect's limit.
+
+        ``target`` (a connection string / URI) also applies that target's limiter.
+        """
+        queued_at = time.perf_counter()
+        if target is None:
+            async with self._slot(dialect) as stats:
+                return await self._in_thread(self._call, fn, args, stats, queued_at)
+        async with target_limiter.acquire(target) as call, self._slot(dialect) as stats:
+            return await self._in_thread(self._call, fn, args, stats, queued_at, call)
+
+    async def stream(
+        self,
+        connection_string: str,
+        produce: Callable[[Connection, Callable[[Any], None]], None],
+        max_buffer: int = QUERY_STREAM_BUFFER,
+        timeout_ms: Optional[int] = None,
+    ) -> AsyncIterator[Any]:
+        """Run ``produce(conn, emit)`` on a worker thread and yield what it emits.
+
+        Streaming always uses the sync engine so drivers can hold a server-side
+        cursor. The buffer between the thread and the consumer is bounded, so a
+        slow client applies backpressure instead of growing memory. Closing the
+        iterator makes the next ``emit`` raise and stops the producer; a statement
+        still executing is cancelled on the server.
+        """
+        dialect = make_url(connection_string).get_backend_name()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        stop = threading.Event()
+        done = object()
+        guard = QueryGuard(connection_string, timeout_ms)
+
+        def emit(item: Any) -> None:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                if stop.is_set():
+                    future.cancel()
+                    raise StreamClosed()
+                try:
+                    future.result(timeout=0.5)
+                    return
+                except FuturesTimeout:
+                    continue
+
+        def runner(stats: _DialectStats, queued_at: float, call: TargetCall) -> None:
+            try:
+                self._run_sync(connection_string, guard.wrap(lambda conn: produce(conn, emit)), stats, queued_at, call)
+            except StreamClosed:
+                return
+            finally:
+                if not stop.is_set():
+                    emit(done)
+
+        queued_at = time.perf_counter()
+        # stream duration follows the client's reading pace, so it is no latency signal
+        async with target_limiter.acquire(connection_string, measure_latency=False) as call, \
+                self._slot(dialect) as stats:
+            future = self._in_thread(runner, stats, queued_at, call)
+            try:
+                while True:
+                    limit = guard.remaining()
+                    if limit is not None and guard.native_timeout:
+                        # let the producer report the dialect's own timeout first
+                        limit = max(guard.deadline + self.cancel_grace - time.monotonic(), 0.0)
+                    try:
+                        item = await asyncio.wait_for(queue.get(), limit)
+                    except asyncio.TimeoutError:
+                        if guard.native_timeout and time.monotonic() < guard.deadline + self.cancel_grace:
+                            continue
+                        stats.timeouts += 1
+                        raise QueryTimeout(f"Query exceeded timeout_ms={guard.timeout_ms}") from None
+                    if item is done:
+                        break
+                    yield item
+                await future
+            finally:
+                stop.set()
+                if not future.done():
+                    await self._cancel(guard, future, stats, "timeout" if guard.expired() else "disconnect")
+
+    async def _supervise(self, work: Awaitable[T], guard: QueryGuard, stats: _DialectStats) -> T:
+        """Await guarded work, cancelling it server-side on deadline or caller cancellation"""
+        task = asyncio.ensure_future(work)
+        try:
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), guard.remaining())
+            except asyncio.TimeoutError:
+                if not guard.native_timeout:
+                    raise
+            # the dialect's own timeout normally reports first; this is the backstop
+            return await asyncio.wait_for(asyncio.shield(task), self.cancel_grace)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            await self._cancel(guard, task, stats, "timeout")
+            raise QueryTimeout(f"Query exceeded timeout_ms={guard.timeout_ms}") from None
+        except asyncio.CancelledError:
+            await self._cancel(guard, task, stats, "disconnect")
+            raise
+
+    async def _cancel(self, guard: QueryGuard, task: "asyncio.Future", stats: _DialectStats, reason: str) -> None:
+        """Cancel the statement behind ``task`` and give it ``cancel_grace`` seconds to unwind"""
+        loop = asyncio.get_running_loop()
+        # default executor: the DB pool may be saturated by the work being cancelled
+        sent = await asyncio.shield(loop.run_in_executor(None, guard.cancel))
+        stats.cancellations += 1
+        db_cancellations.inc(db_type=stats.dialect, reason=reason)
+        logger.warning(f"Cancelling {stats.dialect} query ({reason}); server-side cancel {'sent' if sent else 'unavailable'}")
+        try:
+            await asyncio.wait_for(asyncio.shield(task), self.cancel_grace)
+        except asyncio.CancelledError:
+            if not task.done():
+                raise
+        except Exception:
+            pass
+        if not task.done():
+            # nothing more we can do; the thread finishes on its own
+            logger.warning(f"{stats.dialect} query still running {self.cancel_grace:g}s after cancel")
+
+    @asynccontextmanager
+    async def _slot(self, dialect: str):
+        """Hold one of the dialect's concurrency slots, tracking waiting/active work"""
+        stats = self._stats.get(dialect)
+        if stats is None:
+            stats = self._stats.setdefault(dialect, _DialectStats(dialect))
+        semaphore = self._semaphore(dialect)
+        set_db_type(dialect)
+
+        stats.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+        stats.active += 1
+        try:
+            yield stats
+        except Exception:
+            stats.errors += 1
+            db_errors.inc(db_type=dialect)
+            raise
+        finally:
+            stats.executions += 1
+            stats.active -= 1
+            semaphore.release()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        dialects = {}
+        for dialect, stats in self._stats.items():
+            dialects[dialect] = {
+                "limit": self._limit(dialect),
+                "async_driver": self._async_available.get(dialect, False),
+                "executions": stats.executions,
+                "errors": stats.errors,
+                "timeouts": stats.timeouts,
+                "cancellations": stats.cancellations,
+                "active": stats.active,
+                "waiting": stats.waiting,
+                "queue_wait_avg_ms": round(stats.wait_total / stats.executions * 1000, 3) if stats.executions else 0.0,
+                "queue_wait_max_ms": round(stats.wait_max * 1000, 3),
+            }
+        return {
+            "max_workers": self.max_workers,
+            "default_limit": self.default_limit,
+            "dialects": dialects,
+        }
+
+    def _run_sync(self, connection_string: str, work: Callable[[Connection], T], stats: _DialectStats,
+                  queued_at: float, call: TargetCall) -> T:
+        # queue wait includes time spent waiting for a free worker thread
+        self._record_wait(stats, queued_at)
+        engine = engine_registry.get_engine(connection_string)
+        connecting = time.perf_counter()
+        with engine.connect() as conn:
+            started = time.perf_counter()
+            # the target's latency sample starts here, not at admission
+            call.start()
+            db_connect_wait.observe(started - connecting, db_type=stats.dialect)
+            try:
+                return work(conn)
+            finally:
+                observe_phase("db_execute", time.perf_counter() - started, stats.dialect)
+
+    def _call(self, fn: Callable[..., T], args: tuple, stats: _DialectStats, queued_at: float,
+              call: Optional[TargetCall] = None) -> T:
+        self._record_wait(stats, queued_at)
+        started = time.perf_counter()
+        if call is not None:
+            call.start()
+        try:
+            return fn(*args)
+        finally:
+            observe_phase("db_execute", time.perf_counter() - started, stats.dialect)
+
+    def _in_thread(self, fn: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+        # copy the context so request-scoped metric labels reach the worker thread
+        context = contextvars.copy_context()
+        return asyncio.get_running_loop().run_in_executor(self._pool, context.run, fn, *args)
+
+    @staticmethod
+    def _record_wait(stats: _DialectStats, queued_at: float) -> None:
+        waited = time.perf_counter() - queued_at
+        stats.wait_total += waited
+        stats.wait_max = max(stats.wait_max, waited)
+        db_queue_wait.observe(waited, db_type=stats.dialect)
+
+    def _limit(self, dialect: str) -> int:
+        return self.limits.get(dialect, self.default_limit)
+
+    def _semaphore(self, dialect: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(dialect)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._limit(dialect))
+            self._semaphores[dialect] = semaphore
+        return semaphore
+
+    def _async_url(self, url) -> Optional[str]:
+        """Return the URL rewritten for the dialect's async driver, None to use threads"""
+        dialect = url.get_backend_name()
+        if self.async_drivers == "off" or dialect not in ASYNC_DRIVERS:
+            return None
+        available = self._async_available.get(dialect)
+        if available is None:
+            _, module = ASYNC_DRIVERS[dialect]
+            available = (
+                importlib.util.find_spec(module) is not None
+                and importlib.util.find_spec("greenlet") is not None
+            )
+            self._async_available[dialect] = available
+            logger.info(f"Async driver for {dialect}: {'enabled' if available else 'not installed, using threads'}")
+        if not available:
+            return None
+        driver, _ = ASYNC_DRIVERS[dialect]
+        return url.set(drivername=f"{dialect}+{driver}").render_as_string(hide_password=False)
+
+
+db_executor = DatabaseExecutor()
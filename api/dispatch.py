@@ -0,0 +1,79 @@
+import inspect
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class InProcessDispatcher:
+    """Resolve a proxied operation to its route handler and call it directly.
+
+    Only POST routes whose handler takes nothing but the raw ``Request`` are
+    indexed; those handlers read their payload through ``request.json()``, so the
+    already-parsed body is handed over without another encode/decode pass.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+
+    def bind(self, app: FastAPI) -> int:
+        """Index dispatchable handlers of an app by operation path"""
+        handlers: Dict[str, Callable[..., Any]] = {}
+        for route in app.routes:
+            if not isinstance(route, APIRoute) or "POST" not in route.methods:
+                continue
+            operation = route.path.strip("/")
+            # never dispatch back into the proxy itself
+            if operation.startswith("proxy") or "{" in operation:
+                continue
+            if not self._is_request_only(route):
+                continue
+            handlers[operation] = route.endpoint
+
+        self._handlers = handlers
+        logger.info(f"In-process dispatch enabled for: {sorted(handlers)}")
+        return len(handlers)
+
+    def resolve(self, operation: str) -> Optional[Callable[..., Any]]:
+        return self._handlers.get(operation.strip("/"))
+
+    async def dispatch(self, request: Request, operation: str, payload: Dict[str, Any]) -> Any:
+        """Invoke the handler for ``operation`` with an already-parsed JSON payload"""
+        handler = self.resolve(operation)
+        if handler is None:
+            raise KeyError(operation)
+
+        scope = dict(request.scope)
+        scope.update({
+            "method": "POST",
+            "path": f"/{operation.strip('/')}",
+            "raw_path": f"/{operation.strip('/')}".encode(),
+            "query_string": b"",
+        })
+        # share receive so handlers can still detect client disconnects
+        inner = Request(scope, request.receive)
+        inner._json = payload
+
+        if inspect.iscoroutinefunction(handler):
+            return await handler(inner)
+        return await run_in_threadpool(handler, inner)
+
+    @staticmethod
+    def _is_request_only(route: APIRoute) -> bool:
+        dependant = route.dependant
+        return bool(
+            dependant.request_param_name
+            and not dependant.dependencies
+            and not dependant.path_params
+            and not dependant.query_params
+            and not dependant.header_params
+            and not dependant.cookie_params
+            and not dependant.body_params
+        )
+
+
+dispatcher = InProcessDispatcher()
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from settings import (
+    ENGINE_IDLE_TIMEOUT,
+    ENGINE_MAX_ENGINES,
+    ENGINE_MAX_OVERFLOW,
+    ENGINE_POOL_PRE_PING,
+    ENGINE_POOL_RECYCLE,
+    ENGINE_POOL_SIZE,
+    ENGINE_POOL_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+# (connection string, async) -> engine
+EngineKey = Tuple[str, bool]
+
+
+class _EngineEntry:
+    __slots__ = ("engine", "created_at", "last_used", "uses")
+
+    def __init__(self, engine: Engine | AsyncEngine):
+        now = time.monotonic()
+        self.engine = engine
+        self.created_at = now
+        self.last_used = now
+        self.uses = 0
+
+
+class EngineRegistry:
+    """Process-wide registry of pooled SQLAlchemy engines keyed by connection string.
+
+    Sync and async (``create_async_engine``) engines are tracked side by side.
+    Engines are kept in LRU order by last use. An engine is disposed when it has
+    been idle longer than ``idle_timeout`` seconds or when the registry grows past
+    ``max_engines``.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = ENGINE_POOL_SIZE,
+        max_overflow: int = ENGINE_MAX_OVERFLOW,
+        pool_timeout: float = ENGINE_POOL_TIMEOUT,
+        pool_pre_ping: bool = ENGINE_POOL_PRE_PING,
+        pool_recycle: int = ENGINE_POOL_RECYCLE,
+        idle_timeout: float = ENGINE_IDLE_TIMEOUT,
+        max_engines: int = ENGINE_MAX_ENGINES,
+    ):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_pre_ping = pool_pre_ping
+        self.pool_recycle = pool_recycle
+        self.idle_timeout = idle_timeout
+        self.max_engines = max_engines
+
+        self._engines: "OrderedDict[EngineKey, _EngineEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_engine(self, connection_string: str) -> Engine:
+        """Return the pooled engine for a connection string, creating it on first use"""
+        return self._get((connection_string, False))
+
+    def get_async_engine(self, async_connection_string: str) -> AsyncEngine:
+        """Return the pooled async engine for a connection string using an async driver"""
+        return self._get((async_connection_string, True))
+
+    def _get(self, key: EngineKey):
+        with self._lock:
+            entry = self._engines.get(key)
+            if entry is not None:
+                self._hits += 1
+                self._engines.move_to_end(key)
+            else:
+                self._misses += 1
+                entry = _EngineEntry(self._create_engine(*key))
+                self._engines[key] = entry
+            entry.last_used = time.monotonic()
+            entry.uses += 1
+            expired = self._collect_expired(keep=key)
+
+        self._dispose(expired)
+        return entry.engine
+
+    def evict_idle(self) -> int:
+        """Dispose engines that exceeded the idle timeout; returns the number evicted"""
+        with self._lock:
+            expired = self._collect_expired()
+        self._dispose(expired)
+        return len(expired)
+
+    async def dispose_all(self) -> None:
+        """Close every pool on shutdown, awaiting async engines so their connections close cleanly"""
+        with self._lock:
+            entries = list(self._engines.items())
+            self._engines.clear()
+        for (connection_string, is_async), entry in entries:
+            try:
+                if is_async:
+                    await entry.engine.dispose()
+                else:
+                    entry.engine.dispose()
+            except Exception as e:
+                logger.warning(f"Error disposing engine for {self._redact(connection_string)}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            engines = []
+            for (connection_string, is_async), entry in self._engines.items():
+                pool = entry.engine.pool
+                engines.append({
+                    "url": self._redact(connection_string),
+                    "async": is_async,
+                    "uses": entry.uses,
+                    "idle_seconds": round(time.monotonic() - entry.last_used, 3),
+                    "pool": pool.status(),
+                })
+            lookups = self._hits + self._misses
+            return {
+                "engines": len(self._engines),
+                "max_engines": self.max_engines,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "details": engines,
+            }
+
+    def pool_usage(self) -> Dict[str, Dict[str, int]]:
+        """Checked-out / idle / overflow connections summed per backend (sized pools only)"""
+        usage: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            entries = list(self._engines.items())
+        for (connection_string, _), entry in entries:
+            pool = entry.engine.pool
+            if not hasattr(pool, "checkedout"):
+                continue
+            backend = make_url(connection_string).get_backend_name()
+            totals = usage.setdefault(backend, {"checked_out": 0, "idle": 0, "overflow": 0})
+            totals["checked_out"] += pool.checkedout()
+            totals["idle"] += pool.checkedin()
+            totals["overflow"] += max(pool.overflow(), 0)
+        return usage
+
+    def _create_engine(self, connection_string: str, is_async: bool = False):
+        url = make_url(connection_string)
+        kwargs: Dict[str, Any] = {
+            "pool_pre_ping": self.pool_pre_ping,
+            "pool_recycle": self.pool_recycle,
+        }
+        # SQLite uses file/thread-local pools that do not accept sizing arguments
+        if url.get_backend_name() != "sqlite":
+            kwargs.update(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+            )
+        logger.info(f"Creating pooled engine for {self._redact(connection_string)}")
+        if is_async:
+            return create_async_engine(url, **kwargs)
+        return create_engine(url, **kwargs)
+
+    def _collect_expired(self, keep: EngineKey | None = None) -> list:
+        """Pop idle and over-capacity engines. Must be called with the lock held."""
+        expired = []
+        now = time.monotonic()
+        for key in list(self._engines.keys()):
+            if key == keep:
+                continue
+            entry = self._engines[key]
+            if self.idle_timeout and now - entry.last_used > self.idle_timeout:
+                expired.append((key, self._engines.pop(key)))
+
+        # OrderedDict is in LRU order, oldest first
+        while len(self._engines) > self.max_engines:
+            key = next(iter(self._engines))
+            if key == keep:
+                break
+            expired.append((key, self._engines.pop(key)))
+        return expired
+
+    def _dispose(self, entries: list) -> None:
+        for (connection_string, is_async), entry in entries:
+            with self._lock:
+                self._evictions += 1
+            logger.info(f"Disposing engine for {self._redact(connection_string)}")
+            try:
+                if is_async:
+                    self._dispose_async(entry.engine)
+                else:
+                    entry.engine.dispose()
+            except Exception as e:
+                logger.warning(f"Error disposing engine: {e}")
+
+    @staticmethod
+    def _dispose_async(engine: AsyncEngine) -> None:
+        # async pools must be closed from the event loop
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            engine.sync_engine.dispose(close=False)
+            return
+        loop.create_task(engine.dispose())
+
+    @staticmethod
+    def _redact(connection_string: str) -> str:
+        try:
+            return make_url(connection_string).render_as_string(hide_password=True)
+        except Exception:
+            return "<invalid url>"
+
+
+engine_registry = EngineRegistry()
@@ -0,0 +1,119 @@
+import logging
+from typing import Any, Dict
+
+import httpx
+
+from settings import (
+    HTTP_CLIENT_HTTP2,
+    HTTP_CLIENT_KEEPALIVE_EXPIRY,
+    HTTP_CLIENT_MAX_CONNECTIONS,
+    HTTP_CLIENT_MAX_KEEPALIVE,
+    HTTP_CLIENT_TIMEOUT,
+    PROXY_TARGETS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _TargetStats:
+    __slots__ = ("requests", "new_connections", "errors")
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.errors = 0
+
+
+class HttpClientRegistry:
+    """Long-lived ``httpx.AsyncClient`` per upstream target with keep-alive pooling.
+
+    Clients are created lazily on first use and closed in the app lifespan.
+    New TCP connections are counted through the httpcore ``trace`` extension,
+    so ``requests - new_connections`` is the number of requests that reused a
+    pooled keep-alive connection.
+    """
+
+    def __init__(
+        self,
+        timeout: float = HTTP_CLIENT_TIMEOUT,
+        max_connections: int = HTTP_CLIENT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = HTTP_CLIENT_MAX_KEEPALIVE,
+        keepalive_expiry: float = HTTP_CLIENT_KEEPALIVE_EXPIRY,
+        http2: bool = HTTP_CLIENT_HTTP2,
+    ):
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, _TargetStats] = {}
+
+    def get(self, target: str = "self") -> httpx.AsyncClient:
+        """Return the shared client for a target in PROXY_TARGETS"""
+        client = self._clients.get(target)
+        if client is None or client.is_closed:
+            client = self._create_client(target)
+            self._clients[target] = client
+        return client
+
+    async def close(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        targets = {}
+        for target, stats in self._stats.items():
+            reused = max(stats.requests - stats.new_connections, 0)
+            targets[target] = {
+                "url": PROXY_TARGETS.get(target),
+                "requests": stats.requests,
+                "new_connections": stats.new_connections,
+                "reused_connections": reused,
+                "reuse_ratio": round(reused / stats.requests, 4) if stats.requests else 0.0,
+                "errors": stats.errors,
+            }
+        return {
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "targets": targets,
+        }
+
+    def _create_client(self, target: str) -> httpx.AsyncClient:
+        stats = self._stats.setdefault(target, _TargetStats())
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name in ("connection.connect_tcp.complete", "connection.connect_unix_socket.complete"):
+                stats.new_connections += 1
+
+        async def on_request(request: httpx.Request) -> None:
+            stats.requests += 1
+            request.extensions["trace"] = trace
+
+        async def on_response(response: httpx.Response) -> None:
+            if response.status_code >= 500:
+                stats.errors += 1
+
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP_CLIENT_HTTP2 is enabled but 'h2' is not installed, using HTTP/1.1")
+                http2 = False
+
+        logger.info(f"Creating shared HTTP client for target '{target}'")
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout),
+            limits=self.limits,
+            http2=http2,
+            event_hooks={"request": [on_request], "response": [on_response]},
+        )
+
+
+http_clients = HttpClientRegistry()
@@ -1,25 +1,68 @@
-import os
-import re
-from fastapi import FastAPI, Request, Depends, HTTPException
+import math
+import time
+import asyncio
+from fastapi import FastAPI, Request, Response, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from sqlalchemy import create_engine, text
-import httpx, logging, json
+import httpx, logging
 from datetime import datetime
-from sqlalchemy import URL, create_engine, text
 from services import UniversalProxyService
 from models import DatabaseType, ProxyRequest
-from settings import PROXY_TARGETS
+from settings import PROXY_TARGETS, QUERY_CATALOG_RELOAD, QUERY_STREAM_BATCH_SIZE, QUERY_MAX_ROWS, QUERY_MAX_PARALLEL, DIAGNOSTICS_CHECK_TIMEOUT, REQUEST_COALESCING, QUERY_TIMEOUT_MS, QUERY_MAX_TIMEOUT_MS
+from engine_registry import engine_registry
+from query_catalog import query_catalog
+from http_clients import http_clients
+from dispatch import dispatcher
+from db_executor import db_executor
+from sql_utils import split_statements, is_select
+from streaming import stream_statements, NDJSON_MEDIA_TYPE
+from pagination import cursor_store, fetch_capped, open_pages, resume_page
+from result_format import check_format, encode_result, encode_records, arrow_response
+from operation_registry import operation_registry
+from singleflight import SingleFlight
+from metrics import metrics, bind_request, request_duration, response_size, PROMETHEUS_MEDIA_TYPE
+from query_cache import query_cache
+from nosql_clients import nosql_clients
+from target_limiter import TargetUnavailable, target_limiter
+from tenant_scheduler import tenant_scheduler
+from fastapi.responses import StreamingResponse
+from codec import FastJSONResponse, dumps
+from sqlalchemy.sql.elements import TextClause
 
 # config logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-import socket
+from contextlib import asynccontextmanager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    query_catalog.load()
+    operation_registry.load()
+    dispatcher.bind(app)
+    background = [asyncio.create_task(cursor_store.reap())]
+    if QUERY_CATALOG_RELOAD:
+        background.append(asyncio.create_task(query_catalog.watch()))
+    if query_cache.enabled:
+        background.append(asyncio.create_task(query_cache.watch()))
+    yield
+    for task in background:
+        task.cancel()
+    for held in cursor_store.pop_all():
+        held.close()
+    await http_clients.close()
+    # release pooled DB connections on shutdown
+    await engine_registry.dispose_all()
+    nosql_clients.close_all()
+    db_executor.shutdown()
+
 
 app = FastAPI(
     title="Universal API Proxy",
     description="A flexible API proxy service with dual mode support (self-forwarding and external forwarding)",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # middleware
@@ -36,20 +79,9 @@ app.add_middleware(
     allowed_hosts=["*"]
 )
 
-# HTTP client with timeout and retry
-async def get_http_client():
-    return httpx.AsyncClient(
-        timeout=httpx.Timeout(30.0),
-        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
-    )
-
-# Dependency to get HTTP client
+# Dependency to get the shared HTTP client (kept alive for the app lifetime)
 async def get_client():
-    client = await get_http_client()
-    try:
-        yield client
-    finally:
-        await client.aclose()
+    return http_clients.get("self")
 
 proxy_service = UniversalProxyService()
 
@@ -61,9 +93,9 @@ SUPPORTED_DB_DIRS = {
     "sqlserver": "sqlserver",
     "oracle": "oracle",
     "sqlite": "sqlite",
-    "redis": "Redis",
-    "mongodb": "MongoDB",
-    "mongo": "MongoDB",
+    "redis": "redis",
+    "mongodb": "mongoDB",
+    "mongo": "mongoDB",
 }
 
 def detect_db_type(connection_string: str) -> str:
@@ -74,34 +106,147 @@ def detect_db_type(connection_string: str) -> str:
         if base == "postgres": base = "postgresql"
         if base in ("mssql", "sqlserver"): base = "sqlserver"
         if base == "mongo": base = "mongodb"
+        if base == "rediss": base = "redis"
         return base
     return "mysql"
 
 
-def resolve_query_path(op: str, db_type: str) -> str:
+async def run_query(connection_string: str, query: TextClause, params: dict | None = None, commit: bool = False, fmt: str | None = None, timeout_ms: int | None = None):
+    """Execute a query off the event loop and encode the rows in the requested format"""
+    fmt = check_format(fmt)
+
+    def work(conn):
+        result = conn.execute(query, params or {})
+        # rows: list of dicts, columnar: column arrays, arrow: IPC bytes
+        rows = encode_result(result, fmt)
+        if commit:
+            conn.commit()
+        return rows
+
+    return await db_executor.run(connection_string, work, timeout_ms=timeout_ms)
+
+
+# Identical read-only operations in flight at the same time share one execution
+operation_flights = SingleFlight("operations")
+
+
+async def run_operation(connection_string: str, op: str, params: dict | None = None, commit: bool = False, fmt: str | None = None, timeout_ms: int | None = None):
+    """Run an operation on any backend: Python adapters for MongoDB / Redis, SQL templates otherwise"""
+    db_type = detect_db_type(connection_string)
+    fmt = check_format(fmt)
+    adapter = operation_registry.get(op, db_type)
+    query = resolve_query(op, db_type) if adapter is None else None
+
+    async def execute():
+        if adapter is None:
+            return await run_query(connection_string, query, params, commit, fmt, timeout_ms)
+        # MongoDB / Redis adapters are not cancellable; timeout_ms applies to SQL backends
+        result = await operation_registry.run(adapter, connection_string, params)
+        # adapters return records (list of dicts) or a single document
+        if fmt == "rows" or not isinstance(result, list):
+            return result
+        return encode_records(result, fmt)
+
+    if commit or not REQUEST_COALESCING:
+        rows = await execute()
+    else:
+        # a cancelled caller leaves the shared call running for the others; the
+        # last one to go cancels it (and its query)
+        key = SingleFlight.make_key(connection_string, op, params or {}, fmt, timeout_ms)
+        rows = await operation_flights.do(key, execute)
+
+    # a fresh Response per caller; coalesced callers share the encoded bytes
+    if fmt == "arrow" and isinstance(rows, bytes):
+        return arrow_response(rows)
+    return rows
+
+
+def query_response(body: dict, fmt: str, headers: dict | None = None):
+    """Wrap a /query_sql result (JSON, or Arrow IPC with row count headers) with extra headers"""
+    if fmt == "arrow":
+        return arrow_response(body["result"], headers={
+            "X-Row-Count": str(body["row_count"]),
+            "X-Truncated": str(body["truncated"]).lower(),
+            "X-Estimated-Total": "" if body["estimated_total"] is None else str(body["estimated_total"]),
+            **(headers or {}),
+        })
+    return FastJSONResponse(content=body, headers=headers)
+
+
+def result_response(result):
+    """Render a handler result with the codec (FastAPI would run jsonable_encoder on a bare dict / list)"""
+    if isinstance(result, Response):
+        return result
+    return FastJSONResponse(content=result)
+
+
+def request_timeout(data: dict) -> int | None:
+    """timeout_ms of a payload (QUERY_TIMEOUT_MS when absent), capped by QUERY_MAX_TIMEOUT_MS"""
+    timeout_ms = int(data.get("timeout_ms") or QUERY_TIMEOUT_MS)
+    if QUERY_MAX_TIMEOUT_MS and (not timeout_ms or timeout_ms > QUERY_MAX_TIMEOUT_MS):
+        timeout_ms = QUERY_MAX_TIMEOUT_MS
+    return timeout_ms or None
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def _wait_for_disconnect(request: Request) -> bool:
+    try:
+        while True:
+            message = await request.receive()
+            if message["type"] == "http.disconnect":
+                return True
+    except Exception:
+        # receive channel not usable here: never report a disconnect
+        return False
+
+
+async def cancel_on_disconnect(request: Request, awaitable):
+    """Await ``awaitable``; if the client goes away first, cancel it (and the DB query under it)"""
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if not task.done() and not watcher.result():
+            await task
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+    if task.done():
+        return task.result()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    raise ClientDisconnected(f"Client disconnected from {request.url.path}, query cancelled")
+
+
+def error_response(e: Exception):
+    """Handler error body; a target shedding load becomes a 503 with Retry-After"""
+    if isinstance(e, TargetUnavailable):
+        return FastJSONResponse(
+            status_code=503,
+            content={"error": str(e), "status": e.reason, "target": e.target, "retry_after": round(e.retry_after, 3)},
+            headers={"Retry-After": str(max(math.ceil(e.retry_after), 1))},
+        )
+    return {"error": str(e)}
+
+
+def resolve_query(op: str, db_type: str) -> TextClause:
     """
-    Trả về đường dẫn file query theo op và db_type.
-    - SQL DBs → .sql
-    - MongoDB/Redis → .py
+    Trả về câu query SQL đã compile sẵn trong query catalog theo op và db_type.
+    Không đọc file trên hot path.
     """
     dbt = SUPPORTED_DB_DIRS.get(db_type.lower())
     if not dbt:
         raise HTTPException(status_code=400, detail=f"Unsupported db_type: {db_type}")
 
-    # Chọn phần mở rộng theo loại DB
-    ext = ".py" if dbt in ("MongoDB", "Redis") else ".sql"
-
-    candidate = os.path.join("queries", dbt, f"{op}{ext}")
-    if os.path.exists(candidate):
-        return candidate
-
-    # Fallback legacy (chỉ áp dụng cho SQL .sql)
-    if ext == ".sql":
-        legacy = os.path.join("queries", f"{op}.sql")
-        if os.path.exists(legacy):
-            return legacy
-
-    raise HTTPException(status_code=404, detail=f"Query file not found: {candidate}")
+    query = query_catalog.get(op, dbt)
+    if query is None:
+        raise HTTPException(status_code=404, detail=f"Query not found: {dbt}/{op}.sql")
+    return query
 
 @app.get("/health")
 async def health_check():
@@ -153,10 +298,109 @@ async def get_supported_databases():
         "count": len(DatabaseType)
     }
 
+# Endpoint to inspect the pooled engine registry
+@app.get("/stats/engines")
+async def get_engine_stats():
+    """Get engine registry stats (hits, misses, evictions, pool status)"""
+    engine_registry.evict_idle()
+    return engine_registry.stats()
+
+# Endpoint to inspect request coalescing of identical in-flight operations
+@app.get("/stats/coalescing")
+async def get_coalescing_stats():
+    """Get single-flight stats (executions vs coalesced callers) for operations and Vault lookups"""
+    return {
+        "enabled": REQUEST_COALESCING,
+        "operations": operation_flights.stats(),
+        "vault": proxy_service.vault_cache.stats()["coalesced"],
+    }
+
+# Endpoint to inspect the pooled MongoDB / Redis client registry
+@app.get("/stats/nosql_clients")
+async def get_nosql_client_stats():
+    """Get MongoDB / Redis client registry stats (hits, evictions, pool status)"""
+    nosql_clients.evict_idle()
+    return nosql_clients.stats()
+
+# Endpoint to inspect DB execution concurrency and queue wait
+@app.get("/stats/executor")
+async def get_executor_stats():
+    """Get per-dialect concurrency limits, in-flight work and queue wait"""
+    return db_executor.stats()
+
+# Endpoint to inspect held /query_sql page cursors
+@app.get("/stats/cursors")
+async def get_cursor_stats():
+    """Get held page cursor counts"""
+    return cursor_store.stats()
+
+# Endpoint to inspect shared HTTP client connection reuse
+@app.get("/stats/http_clients")
+async def get_http_client_stats():
+    """Get per-target request and connection reuse counters"""
+    return http_clients.stats()
+
+# Endpoints to inspect / invalidate the Vault config cache
+@app.get("/stats/vault_cache")
+async def get_vault_cache_stats():
+    """Get Vault config cache stats"""
+    return proxy_service.vault_cache.stats()
+
+@app.delete("/cache/vault/{uuid}")
+async def invalidate_vault_cache_entry(uuid: str):
+    """Drop the cached DB config of one UUID (e.g. after rotating its credentials)"""
+    return {"uuid": uuid, "invalidated": proxy_service.vault_cache.invalidate(uuid)}
+
+@app.delete("/cache/vault")
+async def invalidate_vault_cache():
+    """Drop every cached DB config"""
+    return {"invalidated": proxy_service.vault_cache.invalidate()}
+
+# Endpoints to inspect / invalidate the /query_sql result cache
+@app.get("/stats/query_cache")
+async def get_query_cache_stats():
+    """Get query result cache stats (hits, misses, invalidations, bytes)"""
+    return query_cache.stats()
+
+@app.delete("/cache/query")
+async def invalidate_query_cache():
+    """Drop every cached query result"""
+    return {"invalidated": query_cache.invalidate()}
+
+@app.get("/stats/targets")
+async def get_target_stats():
+    """Adaptive limit and circuit breaker state per target DB"""
+    return target_limiter.stats()
+
+@app.get("/stats/tenants")
+async def get_tenant_stats():
+    """Per-tenant admission: active requests, queue depth, wait times, 429s"""
+    return tenant_scheduler.stats()
+
+@app.delete("/targets")
+async def reset_targets():
+    """Forget limiter / breaker state of every idle target (e.g. after fixing a DB)"""
+    return {"reset": target_limiter.reset()}
+
+_route_paths: set | None = None
+
+def operation_label(path: str) -> str:
+    """Metric label for a request path; unknown paths collapse to keep cardinality bounded"""
+    global _route_paths
+    if _route_paths is None:
+        _route_paths = {route.path.strip("/") for route in app.routes if "{" not in getattr(route, "path", "{")}
+    path = path.strip("/")
+    proxied = path.startswith("proxy/")
+    if (path[len("proxy/"):] if proxied else path) in _route_paths:
+        return path
+    return "proxy/other" if proxied else "other"
+
 # Middleware to log requests
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = datetime.now()
+    operation = operation_label(request.url.path)
+    bind_request(operation)
     
     # log request
     logger.info(f"Request: {request.method} {request.url}")
@@ -167,9 +411,89 @@ async def log_requests(request: Request, call_next):
     # log response
     process_time = (datetime.now() - start_time).total_seconds()
     logger.info(f"Response: {response.status_code} - {process_time:.3f}s")
+
+    request_duration.observe(process_time, operation=operation, method=request.method, status=str(response.status_code))
+    content_length = response.headers.get("content-length")
+    if content_length is not None:
+        response_size.observe(int(content_length), operation=operation)
     
     return response
 
+# Prometheus metrics: request/phase latency histograms plus pool, executor and cache state
+@app.get("/metrics")
+async def get_metrics():
+    """Get metrics in the Prometheus text exposition format"""
+    return Response(content=metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE)
+
+def collect_pool_metrics():
+    pools = engine_registry.pool_usage()
+    yield ("db_pool_connections", "gauge", "Pooled DB connections by state",
+           [({"db_type": db_type, "state": state}, count)
+            for db_type, states in pools.items() for state, count in states.items()])
+    executor = db_executor.stats()["dialects"]
+    yield ("db_executor_active", "gauge", "DB work currently running",
+           [({"db_type": d}, s["active"]) for d, s in executor.items()])
+    yield ("db_executor_waiting", "gauge", "DB work waiting for a concurrency slot",
+           [({"db_type": d}, s["waiting"]) for d, s in executor.items()])
+    yield ("db_executor_limit", "gauge", "Concurrency limit per backend",
+           [({"db_type": d}, s["limit"]) for d, s in executor.items()])
+    nosql = {}
+    for client in nosql_clients.stats()["details"]:
+        for state in ("open", "in_use"):
+            key = (client["kind"], state)
+            nosql[key] = nosql.get(key, 0) + client["pool"].get(state, 0)
+    yield ("nosql_pool_connections", "gauge", "MongoDB / Redis pooled connections by state",
+           [({"kind": kind, "state": state}, count) for (kind, state), count in nosql.items()])
+    yield ("query_cursors_held", "gauge", "Held /query_sql page cursors",
+           [({}, cursor_store.stats()["held"])])
+
+def collect_cache_metrics():
+    caches = {"vault": proxy_service.vault_cache.stats(), "query": query_cache.stats()}
+    yield ("cache_hits_total", "counter", "Cache hits",
+           [({"cache": name}, s["hits"] + s.get("negative_hits", 0)) for name, s in caches.items()])
+    yield ("cache_misses_total", "counter", "Cache misses",
+           [({"cache": name}, s["misses"]) for name, s in caches.items()])
+    yield ("cache_hit_ratio", "gauge", "Cache hit ratio since start",
+           [({"cache": name}, s["hit_ratio"]) for name, s in caches.items()])
+    yield ("cache_entries", "gauge", "Cached entries",
+           [({"cache": name}, s["entries"]) for name, s in caches.items()])
+    targets = http_clients.stats()["targets"]
+    yield ("http_client_requests_total", "counter", "Outbound requests per target",
+           [({"target": t}, s["requests"]) for t, s in targets.items()])
+    yield ("http_client_new_connections_total", "counter", "Outbound TCP connections opened per target",
+           [({"target": t}, s["new_connections"]) for t, s in targets.items()])
+
+def collect_coalescing_metrics():
+    flights = {"operations": operation_flights.stats()["coalesced"], "vault": proxy_service.vault_cache.stats()["coalesced"]}
+    yield ("coalesced_requests_total", "counter", "Requests served by joining an identical in-flight call",
+           [({"flight": name}, count) for name, count in flights.items()])
+
+def collect_target_metrics():
+    states = {}
+    for key, target in target_limiter.stats()["targets"].items():
+        db_type = key.split("://", 1)[0]
+        states[(db_type, target["state"])] = states.get((db_type, target["state"]), 0) + 1
+    yield ("db_targets", "gauge", "Tracked target DBs by circuit breaker state",
+           [({"db_type": db_type, "state": state}, count) for (db_type, state), count in states.items()])
+
+def collect_tenant_metrics():
+    queued, active = {}, {}
+    for tenant, s in tenant_scheduler.stats()["tenants"].items():
+        # tenants without a configured weight are summed under "other"
+        label = tenant_scheduler.metric_label(tenant)
+        queued[label] = queued.get(label, 0) + s["queue_depth"]
+        active[label] = active.get(label, 0) + s["active"]
+    yield ("tenant_queue_depth", "gauge", "Proxied requests queued per tenant",
+           [({"tenant": t}, v) for t, v in queued.items()])
+    yield ("tenant_active_requests", "gauge", "Proxied requests running per tenant",
+           [({"tenant": t}, v) for t, v in active.items()])
+
+metrics.register_collector(collect_pool_metrics)
+metrics.register_collector(collect_coalescing_metrics)
+metrics.register_collector(collect_cache_metrics)
+metrics.register_collector(collect_target_metrics)
+metrics.register_collector(collect_tenant_metrics)
+
 # Flexible Proxy Endpoint
 @app.post("/proxy/flexible")
 async def flexible_proxy(
@@ -181,7 +505,7 @@ async def flexible_proxy(
     Receive all arguments in request body
     """    
     # create body from request_data
-    body = json.dumps(request_data.model_dump()).encode()
+    body = dumps(request_data.model_dump())
     
     # create mock request
     mock_request = Request({
@@ -207,25 +531,14 @@ async def check_health(request: Request):
             return {"error": "Missing connection_string in payload"}
 
         db_type = detect_db_type(connection_string)
-        query_path = resolve_query_path("health_check", db_type)
-
-        engine = create_engine(connection_string)
-        with engine.connect() as conn:
-
-            query = text(open(query_path).read())
-            result = conn.execute(query)
+        rows = await cancel_on_disconnect(request, run_operation(connection_string, "health_check", fmt=data.get("format"), timeout_ms=request_timeout(data)))
 
-            logger.info("Log query path: "+query_path)
-            # Convert Row objects to dictionaries
-            rows = []
-            for row in result:
-                rows.append(dict(row._mapping))  # Sử dụng _mapping
-
-            logger.info("Health check query executed successfully")
-            return rows
+        logger.info(f"Log query: {db_type}/health_check")
+        logger.info("Health check query executed successfully")
+        return result_response(rows)
     except Exception as e:
         logger.error(f"Error checking health: {e}")
-        return {"error": str(e)}
+        return error_response(e)
 
 
 @app.post("/db_size")
@@ -239,23 +552,14 @@ async def check_db_size(request: Request):
             return {"error": "Missing connection_string in payload"}
         
         db_type = detect_db_type(connection_string)
-        query_path = resolve_query_path("db_size", db_type)
-        engine = create_engine(connection_string)
-        with engine.connect() as conn:
-
-            query = text(open(query_path).read())
-            result = conn.execute(query, {"db_name": db_name})
+        rows = await cancel_on_disconnect(request, run_operation(connection_string, "db_size", {"db_name": db_name}, fmt=data.get("format"), timeout_ms=request_timeout(data)))
 
-            logger.info("Log query path: "+query_path)
-            # Convert Row objects to dictionaries
-            rows = []
-            for row in result:
-                rows.append(dict(row._mapping))  # Sử dụng _mapping
-
-            logger.info("DB Size query executed successfully")
-            return rows
+        logger.info(f"Log query: {db_type}/db_size")
+        logger.info("DB Size query executed successfully")
+        return result_response(rows)
     except Exception as e:
         logger.error(f"Error checking database size: {e}")
+        return error_response(e)
 
 
 @app.post("/log_space")
@@ -268,24 +572,15 @@ async def check_log_space(request: Request):
             return {"error": "Missing connection_string in payload"}
 
         db_type = detect_db_type(connection_string)
-        query_path = resolve_query_path("log_space", db_type)
-        engine = create_engine(connection_string)
-        with engine.connect() as conn:
-            query = text(open(query_path).read())
-            result = conn.execute(query)
-            
-            logger.info("Log query path: "+query_path)
-            # Convert Row objects to dictionaries
-            rows = []
-            for row in result:
-                rows.append(dict(row._mapping))  # Sử dụng _mapping
-            
-            logger.info("Log Space query executed successfully")
-            return rows
+        rows = await cancel_on_disconnect(request, run_operation(connection_string, "log_space", fmt=data.get("format"), timeout_ms=request_timeout(data)))
+
+        logger.info(f"Log query: {db_type}/log_space")
+        logger.info("Log Space query executed successfully")
+        return result_response(rows)
             
     except Exception as e:
         logger.error(f"Error checking log space: {e}")
-        return {"error": str(e)}
+        return error_response(e)
 
 
 @app.post("/blocking_sessions")
@@ -298,23 +593,14 @@ async def check_blocking_sessions(request: Request):
             return {"error": "Missing connection_string in payload"}
             
         db_type = detect_db_type(connection_string)
-        query_path = resolve_query_path("blocking_session", db_type)
-        engine = create_engine(connection_string)
-        with engine.connect() as conn:
+        rows = await cancel_on_disconnect(request, run_operation(connection_string, "blocking_session", fmt=data.get("format"), timeout_ms=request_timeout(data)))
 
-            query = text(open(query_path).read())
-            result = conn.execute(query)
-            
-            logger.info("Log query path: "+query_path)
-            # Convert Row objects to dictionaries
-            rows = []
-            for row in result:
-                rows.append(dict(row._mapping))
-
-            logger.info("Blocking Sessions query executed successfully")
-            return rows
+        logger.info(f"Log query: {db_type}/blocking_session")
+        logger.info("Blocking Sessions query executed successfully")
+        return result_response(rows)
     except Exception as e:
         logger.error(f"Error checking blocking sessions: {e}")
+        return error_response(e)
 
 
 @app.post("/index_frag")
@@ -329,23 +615,14 @@ async def check_index_fragmentation(request: Request):
             return {"error": "Missing connection_string in payload"}
 
         db_type = detect_db_type(connection_string)
-        query_path = resolve_query_path("index_frag", db_type)
-        engine = create_engine(connection_string)
-        with engine.connect() as conn:
-
-            query = text(open(query_path).read())
-            result = conn.execute(query, {"db_name": db_name})
+        rows = await cancel_on_disconnect(request, run_operation(connection_string, "index_frag", {"db_name": db_name}, fmt=data.get("format"), timeout_ms=request_timeout(data)))
 
-            logger.info("Log query path: "+query_path)
-            # Convert Row objects to dictionaries
-            rows = []
-            for row in result:
-                rows.append(dict(row._mapping))
-
-            logger.info("Index Fragmentation query executed successfully")
-            return rows
+        logger.info(f"Log query: {db_type}/index_frag")
+        logger.info("Index Fragmentation query executed successfully")
+        return result_response(rows)
     except Exception as e:
         logger.error(f"Error checking index frag: {e}")
+        return error_response(e)
 
         
 @app.post("/change_pwd")
@@ -361,23 +638,14 @@ async def change_password(request: Request):
             return {"error": "Missing connection_string in payload"}
 
         db_type = detect_db_type(connection_string)
-        query_path = resolve_query_path("change_pwd", db_type)
-        engine = create_engine(connection_string)
-        with engine.connect() as conn:
-
-            query = text(open(query_path).read())
-            result = conn.execute(query, {"login_name": login_name, "password": new_password})
+        rows = await run_operation(connection_string, "change_pwd", {"login_name": login_name, "password": new_password}, commit=True)
 
-            logger.info("Log query path: "+query_path)
-            # Convert Row objects to dictionaries
-            rows = []
-            for row in result:
-                rows.append(dict(row._mapping))
-
-            logger.info("Change Password query executed successfully")
-            return rows
+        logger.info(f"Log query: {db_type}/change_pwd")
+        logger.info("Change Password query executed successfully")
+        return result_response(rows)
     except Exception as e:
         logger.error(f"Error changing password: {e}")
+        return error_response(e)
 
 @app.post("/list_tables")
 async def list_tables(request: Request):
@@ -391,25 +659,93 @@ async def list_tables(request: Request):
             return {"error": "Missing connection_string in payload"}
 
         db_type = detect_db_type(connection_string)
-        query_path = resolve_query_path("list_table", db_type)
-        engine = create_engine(connection_string)
-        with engine.connect() as conn:
-
-            query = text(open(query_path).read())
-            # Pass db_name parameter to the query
-            result = conn.execute(query, {"db_name": db_name})
-
-            logger.info("Log query path: "+query_path)
-            # Convert Row objects to dictionaries
-            rows = []
-            for row in result:
-                rows.append(dict(row._mapping))
-
-            logger.info("List tables query executed successfully")
-            return rows
+        # Redis listings also accept SCAN options (pattern, count, max_keys, cursor, page_size)
+        params = {"db_name": db_name}
+        params.update({k: data[k] for k in ("pattern", "count", "max_keys", "cursor", "page_size") if k in data})
+        rows = await cancel_on_disconnect(request, run_operation(connection_string, "list_table", params, fmt=data.get("format"), timeout_ms=request_timeout(data)))
+
+        logger.info(f"Log query: {db_type}/list_table")
+        logger.info("List tables query executed successfully")
+        return result_response(rows)
     except Exception as e:
         logger.error(f"Error listing tables: {e}")
-        return {"error": str(e)}
+        return error_response(e)
+
+
+# check name -> (operation, payload params it takes)
+DIAGNOSTIC_CHECKS = {
+    "health_check": ("health_check", ()),
+    "db_size": ("db_size", ("db_name",)),
+    "log_space": ("log_space", ()),
+    "blocking_sessions": ("blocking_session", ()),
+    "index_frag": ("index_frag", ("db_name",)),
+}
+
+
+@app.post("/diagnostics/snapshot")
+async def diagnostics_snapshot(request: Request):
+    """Run the selected diagnostic checks concurrently and return one combined document"""
+    try:
+        data = await request.json()
+        connection_string = data.get("connection_string")
+
+        if not connection_string:
+            return {"error": "Missing connection_string in payload"}
+
+        checks = data.get("checks") or list(DIAGNOSTIC_CHECKS)
+        unknown = [name for name in checks if name not in DIAGNOSTIC_CHECKS]
+        if unknown:
+            return {"error": f"Unknown checks: {', '.join(unknown)}"}
+        if not data.get("timeout_ms"):
+            # legacy "timeout" in seconds, else the per-check default
+            data = {**data, "timeout_ms": int(float(data.get("timeout") or DIAGNOSTICS_CHECK_TIMEOUT) * 1000)}
+        timeout_ms = request_timeout(data)
+        timeout = None if timeout_ms is None else timeout_ms / 1000
+        fmt = check_format(data.get("format"))
+        if fmt == "arrow":
+            # each check would be a binary body; the snapshot is a single JSON document
+            return {"error": "format=arrow is not supported for diagnostics/snapshot, use rows or columnar"}
+
+        async def run_check(name):
+            op, param_names = DIAGNOSTIC_CHECKS[name]
+            params = {key: data.get(key) for key in param_names}
+            started = time.perf_counter()
+            try:
+                # timeout_ms also stops the statement on the server, not just the wait
+                result = await asyncio.wait_for(
+                    run_operation(connection_string, op, params or None, fmt=fmt,
+                                  timeout_ms=timeout_ms),
+                    timeout
+                )
+                outcome = {"status": "ok", "result": result}
+            except asyncio.TimeoutError:
+                outcome = {"status": "timeout", "error": f"Check exceeded {timeout:g}s"}
+            except HTTPException as e:
+                # no template / adapter for this backend
+                outcome = {"status": "unsupported", "error": e.detail}
+            except TargetUnavailable as e:
+                outcome = {"status": "unavailable", "error": str(e), "retry_after": round(e.retry_after, 3)}
+            except Exception as e:
+                outcome = {"status": "error", "error": str(e)}
+            outcome["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+            return name, outcome
+
+        started = time.perf_counter()
+        results = dict(await cancel_on_disconnect(
+            request, asyncio.gather(*(run_check(name) for name in checks))
+        ))
+
+        db_type = detect_db_type(connection_string)
+        logger.info(f"Diagnostics snapshot for {db_type}: " + ", ".join(f"{k}={v['status']}" for k, v in results.items()))
+        return FastJSONResponse(content={
+            "success": all(r["status"] in ("ok", "unsupported") for r in results.values()),
+            "db_type": db_type,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+            "checks": results
+        })
+    except Exception as e:
+        logger.error(f"Error running diagnostics snapshot: {e}")
+        return error_response(e)
 
 
 @app.post("/query_sql")
@@ -422,45 +758,121 @@ async def query_sql(request: Request):
 
         if not connection_string:
             return {"error": "Missing connection_string in payload"}
+
+        # Resume a held cursor: only the token is needed
+        page_token = data.get("page_token")
+        if page_token:
+            return await resume_page(connection_string, page_token)
         
-        statements = [stmt.strip() for stmt in sql.split(';') if stmt.strip()]
+        statements = split_statements(sql)
         if not statements:
             return "No valid SQL statements found"
-        engine = create_engine(connection_string)
-        with engine.connect() as conn:
-            results = []
-            for i, statement in enumerate(statements):
-                if not re.match(r"^\s*select", statement, re.IGNORECASE):
-                    results.append(f"Statement {i+1} refused: Only SELECT allowed")
-                    continue
-                try:
-                    result = conn.execute(text(statement))
-                    rows = []
-                    for row in result:
-                        rows.append(dict(row._mapping))
-
-                    results.append({
-                        "query_index": i + 1,
-                        "sql": statement,
-                        "result": rows,
-                        "row_count": len(rows)
-                    })
-                    
-                except Exception as e:
-                    results.append({
-                        "query_index": i + 1,
-                        "sql": statement,
-                        "error": str(e),
-                        "result": None
+
+        # Deadline for the whole batch; statements are also limited natively per dialect
+        timeout_ms = request_timeout(data)
+
+        # Opt-in NDJSON streaming: header, rows and trailer per statement
+        if data.get("stream"):
+            batch_size = int(data.get("batch_size") or QUERY_STREAM_BATCH_SIZE)
+            return StreamingResponse(
+                stream_statements(connection_string, statements, batch_size, timeout_ms),
+                media_type=NDJSON_MEDIA_TYPE
+            )
+
+        # Hard cap per statement; callers may lower it but never raise it
+        max_rows = min(int(data.get("max_rows") or QUERY_MAX_ROWS), QUERY_MAX_ROWS)
+        fmt = check_format(data.get("format"))
+
+        page_size = data.get("page_size")
+        if page_size and fmt != "arrow":
+            return await open_pages(connection_string, statements, int(page_size), max_rows, fmt)
+
+        # Arrow IPC is a single binary stream, so it carries exactly one result
+        if fmt == "arrow" and (len(statements) != 1 or not is_select(statements[0])):
+            return {"error": "format=arrow requires exactly one SELECT statement"}
+
+        # Identical read-only batches are answered from the result cache
+        cache_key = None
+        cache_headers = {}
+        if query_cache.enabled and query_cache.cacheable(statements):
+            bypass = data.get("cache") is False or "no-cache" in request.headers.get("cache-control", "").lower()
+            if bypass:
+                query_cache.record_bypass()
+                cache_headers["X-Cache"] = "BYPASS"
+            else:
+                cache_key = query_cache.key(connection_string, statements, {"format": fmt, "max_rows": max_rows})
+                cached = query_cache.get(cache_key)
+                if cached is not None:
+                    return query_response(cached.value, fmt, {
+                        "X-Cache": "HIT",
+                        "X-Cache-Age": f"{time.monotonic() - cached.created_at:.3f}",
                     })
-                
-            
-            return {
-                "success": True,
-                "total_queries": len(statements),
-                "results": results
-            }
+                cache_headers["X-Cache"] = "MISS"
+                tables, versions = await query_cache.snapshot(connection_string, statements)
+
+        if fmt == "arrow":
+            body = await cancel_on_disconnect(request, db_executor.run(
+                connection_string, lambda conn: fetch_capped(conn, statements[0], max_rows, fmt), timeout_ms
+            ))
+            if cache_key:
+                query_cache.put(cache_key, body, connection_string, tables, versions)
+            return query_response(body, fmt, cache_headers)
+
+        def run_statement(conn, i, statement):
+            if not is_select(statement):
+                return f"Statement {i+1} refused: Only SELECT allowed"
+            started = time.perf_counter()
+            try:
+                return {
+                    "query_index": i + 1,
+                    "sql": statement,
+                    **fetch_capped(conn, statement, max_rows, fmt),
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+                }
+            except Exception as e:
+                return {
+                    "query_index": i + 1,
+                    "sql": statement,
+                    "error": str(e),
+                    "result": None,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+                }
+
+        if data.get("parallel") and len(statements) > 1:
+            # Independent SELECTs on separate pooled connections, results kept in order
+            max_parallel = min(int(data.get("max_parallel") or QUERY_MAX_PARALLEL), QUERY_MAX_PARALLEL)
+            slots = asyncio.Semaphore(max_parallel)
+
+            async def run_one(i, statement):
+                if not is_select(statement):
+                    return run_statement(None, i, statement)
+                async with slots:
+                    return await db_executor.run(
+                        connection_string, lambda conn: run_statement(conn, i, statement), timeout_ms
+                    )
+
+            results = list(await cancel_on_disconnect(request, asyncio.gather(
+                *(run_one(i, statement) for i, statement in enumerate(statements))
+            )))
+        else:
+            def run_statements(conn):
+                return [run_statement(conn, i, statement) for i, statement in enumerate(statements)]
+
+            results = await cancel_on_disconnect(
+                request, db_executor.run(connection_string, run_statements, timeout_ms)
+            )
+
+        body = {
+            "success": True,
+            "total_queries": len(statements),
+            "results": results
+        }
+        # failed statements may be transient, so only clean batches are cached
+        if cache_key and not any(isinstance(r, dict) and r.get("error") for r in results):
+            query_cache.put(cache_key, body, connection_string, tables, versions)
+        # returned as a response so large results skip jsonable_encoder
+        return query_response(body, fmt, cache_headers or None)
 
     except Exception as e:
         logger.error(f"Error executing SQL query: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return error_response(e)
\ No newline at end of file
@@ -0,0 +1,220 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+LabelValues = Tuple[str, ...]
+# (metric name, type, help, [(labels, value)])
+Sample = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+# Labels of the request being served. The dict is shared by reference with
+# worker threads started from a copied context, so db_type can be filled in
+# wherever it becomes known.
+_request_labels: contextvars.ContextVar[Optional[Dict[str, str]]] = contextvars.ContextVar(
+    "request_labels", default=None
+)
+
+
+def bind_request(operation: str) -> None:
+    _request_labels.set({"operation": operation, "db_type": "unknown"})
+
+
+def set_db_type(db_type: str) -> None:
+    labels = _request_labels.get()
+    if labels is not None:
+        labels["db_type"] = db_type
+
+
+def request_labels() -> Dict[str, str]:
+    return dict(_request_labels.get() or {"operation": "none", "db_type": "unknown"})
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = series
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._values.items())
+        for key, series in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{le} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-1]!r}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format.
+
+    Counters and histograms are updated on the hot path; pool, cache and
+    executor state is read from the existing ``stats()`` methods by collectors
+    at scrape time, so nothing is tracked twice.
+    """
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, kind, help, values in samples:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+request_duration = metrics.histogram(
+    "proxy_request_duration_seconds", "HTTP request latency", ("operation", "method", "status")
+)
+response_size = metrics.histogram(
+    "proxy_response_size_bytes", "HTTP response body size (when Content-Length is known)",
+    ("operation",), SIZE_BUCKETS,
+)
+phase_duration = metrics.histogram(
+    "proxy_phase_duration_seconds",
+    "Time spent per request phase (vault, connstr_build, forward, db_execute, serialize)",
+    ("operation", "db_type", "phase"),
+)
+db_queue_wait = metrics.histogram(
+    "db_executor_queue_wait_seconds", "Time DB work waited for a concurrency slot / worker thread", ("db_type",)
+)
+db_connect_wait = metrics.histogram(
+    "db_pool_checkout_seconds", "Time to check a connection out of the engine pool", ("db_type",)
+)
+db_errors = metrics.counter(
+    "db_execute_errors_total", "DB executions that raised", ("db_type",)
+)
+db_target_rejections = metrics.counter(
+    "db_target_rejections_total", "Calls refused by the per-target limiter or circuit breaker", ("db_type", "reason")
+)
+tenant_queue_wait = metrics.histogram(
+    "tenant_queue_wait_seconds", "Time proxied requests waited for a tenant slot", ("tenant",)
+)
+tenant_rejections = metrics.counter(
+    "tenant_rejections_total", "Proxied requests refused with 429 per tenant", ("tenant", "reason")
+)
+db_cancellations = metrics.counter(
+    "db_query_cancellations_total", "Queries cancelled server-side (timeout or client disconnect)", ("db_type", "reason")
+)
+
+
+def observe_phase(phase: str, seconds: float, db_type: Optional[str] = None) -> None:
+    labels = request_labels()
+    phase_duration.observe(
+        seconds, operation=labels["operation"], db_type=db_type or labels["db_type"], phase=phase
+    )
+
+
+@contextmanager
+def phase(name: str, db_type: Optional[str] = None):
+    """Time a block as one request phase, labelled with the current operation"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_phase(name, time.perf_counter() - started, db_type)
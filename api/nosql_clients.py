@@ -0,0 +1,265 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from settings import (
+    NOSQL_CLIENT_IDLE_TIMEOUT,
+    NOSQL_MAX_CLIENTS,
+    NOSQL_MONGO_MAX_IDLE_TIME_MS,
+    NOSQL_MONGO_MAX_POOL_SIZE,
+    NOSQL_MONGO_MIN_POOL_SIZE,
+    NOSQL_REDIS_MAX_CONNECTIONS,
+    NOSQL_REDIS_POOL_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+# (kind, uri, redis db override) -> client
+ClientKey = Tuple[str, str, Optional[int]]
+
+
+class _PoolCounters:
+    """Connection pool events of one MongoClient (pymongo has no pool status API)"""
+
+    def __init__(self):
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checked_in = 0
+        self.checkout_failed = 0
+
+    def listener(self):
+        from pymongo import monitoring
+
+        counters = self
+
+        class _Listener(monitoring.ConnectionPoolListener):
+            def connection_created(self, event): counters.created += 1
+            def connection_closed(self, event): counters.closed += 1
+            def connection_checked_out(self, event): counters.checked_out += 1
+            def connection_checked_in(self, event): counters.checked_in += 1
+            def connection_check_out_failed(self, event): counters.checkout_failed += 1
+            def pool_created(self, event): pass
+            def pool_ready(self, event): pass
+            def pool_cleared(self, event): pass
+            def pool_closed(self, event): pass
+            def connection_ready(self, event): pass
+            def connection_check_out_started(self, event): pass
+
+        return _Listener()
+
+    def status(self) -> Dict[str, int]:
+        return {
+            "open": self.created - self.closed,
+            "in_use": self.checked_out - self.checked_in,
+            "created": self.created,
+            "checkouts": self.checked_out,
+            "checkout_failed": self.checkout_failed,
+        }
+
+
+class _ClientEntry:
+    __slots__ = ("client", "counters", "created_at", "last_used", "uses")
+
+    def __init__(self, client: Any, counters: Optional[_PoolCounters] = None):
+        now = time.monotonic()
+        self.client = client
+        self.counters = counters
+        self.created_at = now
+        self.last_used = now
+        self.uses = 0
+
+
+class NoSQLClientRegistry:
+    """Process-wide registry of long-lived MongoDB / Redis clients keyed by URI.
+
+    Each client owns a bounded connection pool that is reused across calls
+    instead of reconnecting (and re-authenticating) per request. Clients idle
+    longer than ``idle_timeout`` seconds, or beyond ``max_clients`` in LRU
+    order, are closed. pymongo and redis are only imported when first used.
+    """
+
+    def __init__(
+        self,
+        mongo_max_pool_size: int = NOSQL_MONGO_MAX_POOL_SIZE,
+        mongo_min_pool_size: int = NOSQL_MONGO_MIN_POOL_SIZE,
+        mongo_max_idle_time_ms: int = NOSQL_MONGO_MAX_IDLE_TIME_MS,
+        redis_max_connections: int = NOSQL_REDIS_MAX_CONNECTIONS,
+        redis_pool_timeout: float = NOSQL_REDIS_POOL_TIMEOUT,
+        idle_timeout: float = NOSQL_CLIENT_IDLE_TIMEOUT,
+        max_clients: int = NOSQL_MAX_CLIENTS,
+    ):
+        self.mongo_max_pool_size = mongo_max_pool_size
+        self.mongo_min_pool_size = mongo_min_pool_size
+        self.mongo_max_idle_time_ms = mongo_max_idle_time_ms
+        self.redis_max_connections = redis_max_connections
+        self.redis_pool_timeout = redis_pool_timeout
+        self.idle_timeout = idle_timeout
+        self.max_clients = max_clients
+
+        self._clients: "OrderedDict[ClientKey, _ClientEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def mongo(self, uri: str):
+        """Return the shared ``MongoClient`` for a URI"""
+        return self._get(("mongodb", uri, None))
+
+    def redis(self, url: str, db: Optional[int] = None):
+        """Return the shared ``redis.Redis`` client for a URL (``db`` overrides the URL's database)"""
+        return self._get(("redis", url, db))
+
+    def _get(self, key: ClientKey):
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                self._hits += 1
+                self._clients.move_to_end(key)
+            else:
+                self._misses += 1
+                entry = self._create(*key)
+                self._clients[key] = entry
+            entry.last_used = time.monotonic()
+            entry.uses += 1
+            expired = self._collect_expired(keep=key)
+
+        self._close(expired)
+        return entry.client
+
+    def evict_idle(self) -> int:
+        """Close clients that exceeded the idle timeout; returns the number evicted"""
+        with self._lock:
+            expired = self._collect_expired()
+        self._close(expired)
+        return len(expired)
+
+    def close_all(self) -> None:
+        with self._lock:
+            entries = list(self._clients.items())
+            self._clients.clear()
+        for (kind, uri, _), entry in entries:
+            try:
+                self._close_client(kind, entry.client)
+            except Exception as e:
+                logger.warning(f"Error closing {kind} client for {self._redact(uri)}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clients = []
+            for (kind, uri, db), entry in self._clients.items():
+                clients.append({
+                    "kind": kind,
+                    "url": self._redact(uri),
+                    "db": db,
+                    "uses": entry.uses,
+                    "idle_seconds": round(time.monotonic() - entry.last_used, 3),
+                    "pool": self._pool_status(kind, entry),
+                })
+            lookups = self._hits + self._misses
+            return {
+                "clients": len(self._clients),
+                "max_clients": self.max_clients,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "mongo_max_pool_size": self.mongo_max_pool_size,
+                "redis_max_connections": self.redis_max_connections,
+                "details": clients,
+            }
+
+    def _create(self, kind: str, uri: str, db: Optional[int]) -> _ClientEntry:
+        logger.info(f"Creating pooled {kind} client for {self._redact(uri)}")
+        if kind == "mongodb":
+            from pymongo import MongoClient
+
+            counters = _PoolCounters()
+            client = MongoClient(
+                uri,
+                maxPoolSize=self.mongo_max_pool_size,
+                minPoolSize=self.mongo_min_pool_size,
+                maxIdleTimeMS=self.mongo_max_idle_time_ms,
+                event_listeners=[counters.listener()],
+            )
+            return _ClientEntry(client, counters)
+
+        import redis
+
+        kwargs: Dict[str, Any] = {
+            "max_connections": self.redis_max_connections,
+            "timeout": self.redis_pool_timeout,
+        }
+        if db is not None:
+            kwargs["db"] = db
+        # blocking pool: callers wait for a free connection instead of failing
+        pool = redis.BlockingConnectionPool.from_url(uri, **kwargs)
+        return _ClientEntry(redis.Redis(connection_pool=pool))
+
+    @staticmethod
+    def _pool_status(kind: str, entry: _ClientEntry) -> Dict[str, Any]:
+        if kind == "mongodb":
+            return entry.counters.status()
+        pool = entry.client.connection_pool
+        # BlockingConnectionPool keeps None placeholders for connections not opened yet
+        idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        return {
+            "open": len(pool._connections),
+            "idle": idle,
+            "in_use": len(pool._connections) - idle,
+            "max_connections": pool.max_connections,
+        }
+
+    def _collect_expired(self, keep: ClientKey | None = None) -> list:
+        """Pop idle and over-capacity clients. Must be called with the lock held."""
+        expired = []
+        now = time.monotonic()
+        for key in list(self._clients.keys()):
+            if key == keep:
+                continue
+            entry = self._clients[key]
+            if self.idle_timeout and now - entry.last_used > self.idle_timeout:
+                expired.append((key, self._clients.pop(key)))
+
+        # OrderedDict is in LRU order, oldest first
+        while len(self._clients) > self.max_clients:
+            key = next(iter(self._clients))
+            if key == keep:
+                break
+            expired.append((key, self._clients.pop(key)))
+        return expired
+
+    def _close(self, entries: list) -> None:
+        for (kind, uri, _), entry in entries:
+            with self._lock:
+                self._evictions += 1
+            logger.info(f"Closing {kind} client for {self._redact(uri)}")
+            try:
+                self._close_client(kind, entry.client)
+            except Exception as e:
+                logger.warning(f"Error closing {kind} client: {e}")
+
+    @staticmethod
+    def _close_client(kind: str, client: Any) -> None:
+        client.close()
+        if kind == "redis":
+            # an explicitly passed pool is not closed by Redis.close()
+            client.connection_pool.disconnect()
+
+    @staticmethod
+    def _redact(uri: str) -> str:
+        try:
+            parts = urlsplit(uri)
+            if parts.password is None:
+                return uri
+            netloc = parts.netloc.replace(f":{parts.password}@", ":***@", 1)
+            return urlunsplit(parts._replace(netloc=netloc))
+        except Exception:
+            return "<invalid url>"
+
+
+nosql_clients = NoSQLClientRegistry()
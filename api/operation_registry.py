@@ -0,0 +1,109 @@
+import functools
+import importlib.util
+import inspect
+import logging
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from db_executor import db_executor
+from settings import QUERIES_DIR
+
+logger = logging.getLogger(__name__)
+
+# db type -> adapter dir under queries/, and per operation:
+# (module file, entry point, payload param -> adapter param renames)
+ADAPTERS: Dict[str, Tuple[str, Dict[str, Tuple[str, str, Dict[str, str]]]]] = {
+    "mongodb": ("mongoDB", {
+        "health_check": ("heal_check", "get_health_check_mongo", {}),
+        "db_size": ("db_size", "get_db_size_mongo", {}),
+        "log_space": ("log_space", "get_log_space_mongo", {}),
+        "change_pwd": ("change_pwd", "change_pwd_mongo", {}),
+        "list_table": ("list_table", "list_tables", {}),
+    }),
+    "redis": ("redis", {
+        "health_check": ("heal_check", "get_health_check_redis", {}),
+        "db_size": ("db_size", "get_db_size_redis", {}),
+        "log_space": ("log_space", "get_log_space_redis", {}),
+        "change_pwd": ("change_pwd", "change_pwd_redis", {"login_name": "username"}),
+        "list_table": ("list_table", "list_tables", {}),
+    }),
+}
+
+
+class Operation:
+    """A loaded adapter entry point plus the keyword arguments it accepts"""
+
+    __slots__ = ("name", "db_type", "fn", "accepts", "renames")
+
+    def __init__(self, name: str, db_type: str, fn: Callable[..., Any], renames: Dict[str, str]):
+        self.name = name
+        self.db_type = db_type
+        self.fn = fn
+        self.renames = renames
+        # first parameter is the connection string / URI
+        self.accepts = set(list(inspect.signature(fn).parameters)[1:])
+
+    def bind(self, connection_string: str, params: Optional[Dict[str, Any]]) -> Callable[[], Any]:
+        kwargs = {}
+        for key, value in (params or {}).items():
+            key = self.renames.get(key, key)
+            if key in self.accepts and value is not None:
+                kwargs[key] = value
+        return functools.partial(self.fn, connection_string, **kwargs)
+
+
+class OperationRegistry:
+    """(operation, db_type) -> callable for backends served by Python adapters.
+
+    MongoDB / Redis operations live in ``queries/<db>/*.py`` modules. Each module
+    is imported once at startup and its entry point cached, so requests never
+    import or read files. Calls run on the DB executor's thread pool under the
+    backend's concurrency limit, next to the SQL templates.
+    """
+
+    def __init__(self, base_dir: str = QUERIES_DIR):
+        self.base_dir = base_dir
+        self._operations: Dict[Tuple[str, str], Operation] = {}
+
+    def load(self) -> int:
+        """Import every adapter module; returns the number of operations registered"""
+        operations: Dict[Tuple[str, str], Operation] = {}
+        for db_type, (directory, entries) in ADAPTERS.items():
+            modules: Dict[str, Any] = {}
+            for op, (module_name, entry_point, renames) in entries.items():
+                path = os.path.join(self.base_dir, directory, f"{module_name}.py")
+                try:
+                    if module_name not in modules:
+                        modules[module_name] = self._import(db_type, module_name, path)
+                    fn = getattr(modules[module_name], entry_point)
+                except Exception as e:
+                    # e.g. pymongo / redis not installed
+                    logger.warning(f"Skipping {db_type}/{op} adapter ({path}): {e}")
+                    continue
+                operations[(op, db_type)] = Operation(op, db_type, fn, renames)
+
+        self._operations = operations
+        logger.info(f"Loaded {len(operations)} adapter operations: {sorted(f'{d}/{o}' for o, d in operations)}")
+        return len(operations)
+
+    def get(self, operation: str, db_type: str) -> Optional[Operation]:
+        return self._operations.get((operation, db_type))
+
+    def keys(self):
+        return list(self._operations.keys())
+
+    async def run(self, operation: Operation, connection_string: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Call an adapter on the thread pool under its backend's concurrency limit"""
+        return await db_executor.run_blocking(
+            operation.db_type, operation.bind(connection_string, params), target=connection_string
+        )
+
+    @staticmethod
+    def _import(db_type: str, module_name: str, path: str):
+        spec = importlib.util.spec_from_file_location(f"adapters.{db_type}.{module_name}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+
+operation_registry = OperationRegistry()
@@ -0,0 +1,309 @@
+import asyncio
+import json
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import exc as sa_exc, text
+from sqlalchemy.engine import Connection, make_url
+
+from db_executor import db_executor
+from engine_registry import engine_registry
+from settings import (
+    ENGINE_MAX_OVERFLOW,
+    ENGINE_POOL_SIZE,
+    QUERY_CURSOR_TTL,
+    QUERY_MAX_CURSORS,
+    QUERY_MAX_CURSORS_PER_TARGET,
+)
+from sql_utils import is_select
+from target_limiter import TargetUnavailable
+from result_format import encode
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_total(conn: Connection, statement: str) -> Optional[int]:
+    """Planner row estimate for a SELECT (MySQL / PostgreSQL), None when unavailable"""
+    dialect = conn.dialect.name
+    try:
+        if dialect == "mysql":
+            rows = conn.execute(text(f"EXPLAIN {statement}")).mappings().all()
+            estimates = [int(row["rows"]) for row in rows if row.get("rows") is not None]
+            return max(estimates) if estimates else None
+        if dialect == "postgresql":
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {statement}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.warning(f"Could not estimate row count: {e}")
+    return None
+
+
+# dialect -> the statement wrapped with a server-side row cap, so closing a truncated
+# result never reads the rest of a big scan (MySQL's SSCursor drains it on close).
+# PostgreSQL named cursors close cheaply and are left alone: a failed attempt would
+# abort the transaction holding the guard's statement_timeout.
+_ROW_CAPS = {
+    "mysql": "SELECT * FROM (\n{statement}\n) _q LIMIT {limit}",
+    "sqlite": "SELECT * FROM (\n{statement}\n) _q LIMIT {limit}",
+    "oracle": "SELECT * FROM (\n{statement}\n) WHERE ROWNUM <= {limit}",
+}
+
+
+def execute_capped(conn: Connection, statement: str, limit: int, **options: Any):
+    """Execute a SELECT on a server-side cursor, returning at most ``limit`` rows where the dialect can cap it"""
+    streaming = conn.execution_options(stream_results=True, **options)
+    template = _ROW_CAPS.get(conn.dialect.name)
+    if template is not None:
+        capped = template.format(statement=statement.strip().rstrip(";"), limit=int(limit))
+        try:
+            return streaming.execute(text(capped))
+        except sa_exc.DBAPIError as e:
+            # e.g. duplicate column names are not allowed in a derived table
+            logger.debug(f"Row cap not applicable, running the statement as is: {e}")
+    return streaming.execute(text(statement))
+
+
+def fetch_capped(conn: Connection, statement: str, max_rows: int, fmt: str = "rows") -> Dict[str, Any]:
+    """Execute a SELECT and fetch at most ``max_rows`` rows from a server-side cursor"""
+    result = execute_capped(conn, statement, max_rows + 1)
+    columns = list(result.keys())
+    rows = result.fetchmany(max_rows + 1)
+    truncated = len(rows) > max_rows
+    if truncated:
+        rows = rows[:max_rows]
+        result.close()
+        estimated = estimate_total(conn, statement)
+    else:
+        estimated = len(rows)
+    return {
+        "result": encode(columns, rows, fmt),
+        "row_count": len(rows),
+        "truncated": truncated,
+        "estimated_total": estimated,
+    }
+
+
+class _HeldCursor:
+    """An open result on a dedicated connection, resumable by page token"""
+
+    def __init__(self, connection_string: str, conn: Connection, result, query_index: int,
+                 sql: str, page_size: int, max_rows: int, estimated_total: Optional[int],
+                 fmt: str = "rows"):
+        self.token = secrets.token_urlsafe(24)
+        self.connection_string = connection_string
+        self.conn = conn
+        self.result = result
+        self.query_index = query_index
+        self.sql = sql
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.estimated_total = estimated_total
+        self.fmt = fmt
+        self.columns = list(result.keys())
+        self.served = 0
+        self.pending: list = []
+        self.exhausted = False
+        self.expires_at = 0.0
+
+    def next_page(self) -> Dict[str, Any]:
+        """Fetch the next page (blocking); peeks one row ahead to know if more remain"""
+        offset = self.served
+        want = min(self.page_size, self.max_rows - self.served)
+        batch = self.pending + list(self.result.fetchmany(want + 1 - len(self.pending)))
+        self.pending = batch[want:]
+        batch = batch[:want]
+        self.served += len(batch)
+
+        has_more = bool(self.pending)
+        truncated = has_more and self.served >= self.max_rows
+        self.exhausted = not has_more or truncated
+        estimated = self.served if not has_more else self.estimated_total
+        return {
+            "query_index": self.query_index,
+            "sql": self.sql,
+            "result": encode(self.columns, batch, self.fmt),
+            "row_count": len(batch),
+            "offset": offset,
+            "truncated": truncated,
+            "estimated_total": estimated,
+            "next_page_token": None if self.exhausted else self.token,
+        }
+
+    def close(self) -> None:
+        try:
+            self.result.close()
+        finally:
+            self.conn.close()
+
+
+class CursorStore:
+    """Held server-side cursors by page token, closed after ``ttl`` seconds idle.
+
+    Each held cursor pins one pooled connection, so at most ``max_cursors`` are
+    kept, and at most ``max_per_target`` per connection string (always below its
+    pool's capacity, so other queries to that DB still get a connection);
+    opening another closes the least recently used one.
+    """
+
+    def __init__(self, ttl: float = QUERY_CURSOR_TTL, max_cursors: int = QUERY_MAX_CURSORS,
+                 max_per_target: int = QUERY_MAX_CURSORS_PER_TARGET):
+        self.ttl = ttl
+        self.max_cursors = max_cursors
+        self.max_per_target = max(min(max_per_target, ENGINE_POOL_SIZE + ENGINE_MAX_OVERFLOW - 1), 1)
+        self._cursors: "OrderedDict[str, _HeldCursor]" = OrderedDict()
+        self._opened = 0
+        self._expired = 0
+
+    def put(self, held: _HeldCursor) -> List[_HeldCursor]:
+        """Store a cursor; returns cursors pushed out by the capacity limit"""
+        held.expires_at = time.monotonic() + self.ttl
+        if held.token not in self._cursors:
+            self._opened += 1
+        self._cursors[held.token] = held
+        self._cursors.move_to_end(held.token)
+        evicted = []
+        same_target = [token for token, other in self._cursors.items()
+                       if other.connection_string == held.connection_string]
+        for token in same_target[:max(len(same_target) - self.max_per_target, 0)]:
+            evicted.append(self._cursors.pop(token))
+        while len(self._cursors) > self.max_cursors:
+            evicted.append(self._cursors.popitem(last=False)[1])
+        return evicted
+
+    def take(self, token: str, connection_string: str) -> Optional[_HeldCursor]:
+        """Remove and return a live cursor; tokens only resume on the same connection"""
+        held = self._cursors.get(token)
+        if held is None or held.connection_string != connection_string:
+            return None
+        del self._cursors[token]
+        if held.expires_at < time.monotonic():
+            self._expired += 1
+            asyncio.ensure_future(_close(held))
+            return None
+        return held
+
+    def pop_expired(self) -> List[_HeldCursor]:
+        now = time.monotonic()
+        expired = [token for token, held in self._cursors.items() if held.expires_at < now]
+        self._expired += len(expired)
+        return [self._cursors.pop(token) for token in expired]
+
+    def pop_all(self) -> List[_HeldCursor]:
+        held = list(self._cursors.values())
+        self._cursors.clear()
+        return held
+
+    async def reap(self, interval: float | None = None) -> None:
+        """Background task closing cursors whose TTL has passed"""
+        interval = interval or max(self.ttl / 4, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            for held in self.pop_expired():
+                await _close(held)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "held": len(self._cursors),
+            "max_cursors": self.max_cursors,
+            "max_per_target": self.max_per_target,
+            "ttl": self.ttl,
+            "opened": self._opened,
+            "expired": self._expired,
+        }
+
+
+cursor_store = CursorStore()
+
+
+async def _close(held: _HeldCursor) -> None:
+    try:
+        await db_executor.run_blocking(_dialect(held.connection_string), held.close)
+    except Exception as e:
+        logger.warning(f"Error closing held cursor: {e}")
+
+
+def _dialect(connection_string: str) -> str:
+    return make_url(connection_string).get_backend_name()
+
+
+def _open_cursor(connection_string: str, query_index: int, statement: str,
+                 page_size: int, max_rows: int, fmt: str) -> tuple:
+    """Open a statement on its own connection and read the first page (blocking)"""
+    conn = engine_registry.get_engine(connection_string).connect()
+    try:
+        # EXPLAIN first: MySQL cannot run another query while a streamed result is open
+        estimated = estimate_total(conn, statement)
+        # one row past max_rows tells a truncated result from a complete one
+        result = execute_capped(conn, statement, max_rows + 1, yield_per=page_size)
+        held = _HeldCursor(connection_string, conn, result, query_index, statement,
+                           page_size, max_rows, estimated, fmt)
+        page = held.next_page()
+    except Exception:
+        conn.close()
+        raise
+    if held.exhausted:
+        held.close()
+        return page, None
+    return page, held
+
+
+async def open_pages(connection_string: str, statements: List[str], page_size: int, max_rows: int,
+                     fmt: str = "rows") -> Dict[str, Any]:
+    """Run each SELECT and return its first page plus a token for the rest"""
+    dialect = _dialect(connection_string)
+    results: List[Any] = []
+    for i, statement in enumerate(statements):
+        if not is_select(statement):
+            results.append(f"Statement {i+1} refused: Only SELECT allowed")
+            continue
+        try:
+            page, held = await db_executor.run_blocking(
+                dialect, _open_cursor, connection_string, i + 1, statement, page_size, max_rows, fmt,
+                target=connection_string
+            )
+        except TargetUnavailable:
+            # the whole request is refused, not just this statement
+            raise
+        except Exception as e:
+            results.append({"query_index": i + 1, "sql": statement, "error": str(e), "result": None})
+            continue
+        if held is not None:
+            for evicted in cursor_store.put(held):
+                await _close(evicted)
+        results.append(page)
+
+    return {
+        "success": True,
+        "total_queries": len(statements),
+        "page_size": page_size,
+        "results": results,
+    }
+
+
+async def resume_page(connection_string: str, page_token: str) -> Dict[str, Any]:
+    """Fetch the next page of a held cursor"""
+    held = cursor_store.take(page_token, connection_string)
+    if held is None:
+        return {"error": "Invalid or expired page_token"}
+
+    try:
+        page = await db_executor.run_blocking(_dialect(connection_string), held.next_page)
+    except Exception as e:
+        await _close(held)
+        return {"error": str(e)}
+
+    if held.exhausted:
+        await _close(held)
+    else:
+        cursor_store.put(held)
+    return {
+        "success": True,
+        "total_queries": 1,
+        "page_size": held.page_size,
+        "results": [page],
+    }
@@ -1,7 +1,7 @@
-from pymongo import MongoClient
+from nosql_clients import nosql_clients
 
 def change_pwd_mongo(uri: str, login_name: str, password: str, db_name: str = "admin"):
-    client = MongoClient(uri)
+    client = nosql_clients.mongo(uri)
     db = client[db_name]
     db.command("updateUser", login_name, pwd=password)
     return {"status": "ok"}
\ No newline at end of file
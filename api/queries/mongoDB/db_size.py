@@ -1,7 +1,7 @@
-from pymongo import MongoClient
+from nosql_clients import nosql_clients
 
 def get_db_size_mongo(uri: str, db_name: str | None = None):
-    client = MongoClient(uri)
+    client = nosql_clients.mongo(uri)
     if db_name:
         stats = client[db_name].command("dbStats")
         return [{
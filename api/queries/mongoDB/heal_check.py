@@ -1,8 +1,8 @@
-from pymongo import MongoClient
+from nosql_clients import nosql_clients
 from datetime import datetime
 
 def get_health_check_mongo(uri: str):
-    client = MongoClient(uri)
+    client = nosql_clients.mongo(uri)
     try:
         # Server info
         server_info = client.server_info()
@@ -1,53 +1,83 @@
 # MongoDB: List all collections (equivalent to tables) in a database
-from pymongo import MongoClient
+from concurrent.futures import ThreadPoolExecutor
+from pymongo.errors import OperationFailure
 import logging
+import os
+
+from nosql_clients import nosql_clients
 
 logger = logging.getLogger(__name__)
 
-def list_tables(connection_string, db_name):
+# Collections whose stats are fetched at the same time
+DEFAULT_STATS_PARALLELISM = int(os.environ.get("MONGO_STATS_PARALLELISM", "8"))
+
+
+def _collection_stats(db, collection_name):
+    """Storage stats of one collection via $collStats (summed over shards)"""
+    try:
+        shards = [doc.get("storageStats", {}) for doc in
+                  db[collection_name].aggregate([{"$collStats": {"storageStats": {}}}])]
+    except OperationFailure:
+        # servers without $collStats (or without permission for it)
+        return db.command("collStats", collection_name)
+
+    count = sum(s.get("count", 0) for s in shards)
+    size = sum(s.get("size", 0) for s in shards)
+    index_sizes = {}
+    for s in shards:
+        index_sizes.update(s.get("indexSizes", {}))
+    return {
+        "count": count,
+        "size": size,
+        "indexSizes": index_sizes,
+        "avgObjSize": size / count if count else 0,
+    }
+
+
+def _collection_info(db_name, collection_name, stats):
+    return {
+        'database_name': db_name,
+        'table_name': collection_name,  # Using table_name for consistency
+        'table_type': 'MONGO_COLLECTION',
+        'estimated_rows': stats.get('count', 0),
+        'size_mb': round(stats.get('size', 0) / 1024 / 1024, 2),
+        'table_comment': 'MongoDB Collection',
+        'created_at': None,
+        'updated_at': None,
+        'indexes': len(stats.get('indexSizes', {})),
+        'avg_obj_size': stats.get('avgObjSize', 0)
+    }
+
+
+def list_tables(connection_string, db_name, parallelism=DEFAULT_STATS_PARALLELISM):
     """
     List all collections in a MongoDB database
-    
+
     Args:
         connection_string (str): MongoDB connection string
         db_name (str): Database name to list collections from
-    
+        parallelism (int): Collections whose stats are fetched concurrently
+
     Returns:
         list: List of dictionaries containing collection information
     """
     try:
-        # Connect to MongoDB
-        client = MongoClient(connection_string)
-        db = client[db_name]
-        
-        # Get list of collections
-        collections = db.list_collection_names()
-        
-        result = []
-        for collection_name in collections:
-            # Get collection stats
-            stats = db.command("collStats", collection_name)
-            
-            collection_info = {
-                'database_name': db_name,
-                'table_name': collection_name,  # Using table_name for consistency
-                'table_type': 'MONGO_COLLECTION',
-                'estimated_rows': stats.get('count', 0),
-                'size_mb': round(stats.get('size', 0) / 1024 / 1024, 2),
-                'table_comment': 'MongoDB Collection',
-                'created_at': None,
-                'updated_at': None,
-                'indexes': len(stats.get('indexSizes', {})),
-                'avg_obj_size': stats.get('avgObjSize', 0)
-            }
-            result.append(collection_info)
-        
+        db = nosql_clients.mongo(connection_string)[db_name]
+
+        # Views have no storage stats
+        collections = db.list_collection_names(filter={"type": "collection"})
+
+        # One $collStats round-trip per collection, run concurrently on the shared pool
+        workers = max(1, min(parallelism, len(collections)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            stats = pool.map(lambda name: _collection_stats(db, name), collections)
+            result = [_collection_info(db_name, name, s) for name, s in zip(collections, stats)]
+
         # Sort by collection name
         result.sort(key=lambda x: x['table_name'])
-        
-        client.close()
+
         return result
-        
+
     except Exception as e:
         logger.error(f"Error listing MongoDB collections: {e}")
         return {"error": str(e)}
@@ -1,7 +1,7 @@
-from pymongo import MongoClient
+from nosql_clients import nosql_clients
 
 def get_log_space_mongo(uri: str):
-    client = MongoClient(uri)
+    client = nosql_clients.mongo(uri)
     dbs = client.admin.command("listDatabases")
     return [
         {
@@ -1,7 +1,7 @@
-import redis
+from nosql_clients import nosql_clients
 
 def change_pwd_redis(redis_url: str, username: str | None, password: str):
-    r = redis.from_url(redis_url)
+    r = nosql_clients.redis(redis_url)
     if username and username != "default":
         # Redis ACL user (Redis 6+)
         r.acl_setuser(username, "on", f">#{password}")  # or f">{password}" if not using hashed
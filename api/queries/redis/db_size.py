@@ -1,7 +1,7 @@
-import redis
+from nosql_clients import nosql_clients
 
 def get_db_size_redis(redis_url: str):
-    r = redis.from_url(redis_url)
+    r = nosql_clients.redis(redis_url)
     info = r.info()
     out = {
         "UsedMemoryBytes": info.get("used_memory", 0),
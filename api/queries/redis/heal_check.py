@@ -1,8 +1,8 @@
-import redis
+from nosql_clients import nosql_clients
 from datetime import datetime
 
 def get_health_check_redis(redis_url: str):
-    r = redis.from_url(redis_url)
+    r = nosql_clients.redis(redis_url)
     try:
         info = r.info()
         return {
@@ -1,86 +1,166 @@
 # Redis: List all keys (equivalent to tables) in a Redis database
-import redis
 import logging
 
+from nosql_clients import nosql_clients
+
 logger = logging.getLogger(__name__)
 
-def list_tables(connection_string, db_name=None):
+# Keys asked per SCAN call (a hint to the server, not an exact batch size)
+DEFAULT_SCAN_COUNT = 1000
+# Sampling cap for a full listing; 0 lists every key
+DEFAULT_MAX_KEYS = 10000
+
+# key type -> length command
+_LENGTH_COMMANDS = {
+    'list': 'llen',
+    'set': 'scard',
+    'zset': 'zcard',
+    'hash': 'hlen',
+    'stream': 'xlen',
+}
+
+
+def _connect(connection_string, db_name=None):
+    """Shared Redis client, optionally overriding the database number of the URL"""
+    # Assuming connection_string format: redis://host:port/db
+    if db_name is not None:
+        try:
+            return nosql_clients.redis(connection_string, db=int(db_name))
+        except ValueError:
+            logger.warning(f"Invalid database number: {db_name}, using default")
+    return nosql_clients.redis(connection_string)
+
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def _describe_batch(r, keys, database_name):
+    """Key metadata for one SCAN batch in two pipelined round-trips"""
+    pipe = r.pipeline(transaction=False)
+    for key in keys:
+        pipe.type(key)
+        pipe.ttl(key)
+        pipe.memory_usage(key)
+    # MEMORY USAGE is missing on old servers; errors come back as values
+    replies = pipe.execute(raise_on_error=False)
+
+    types = []
+    pipe = r.pipeline(transaction=False)
+    for i, key in enumerate(keys):
+        key_type = _decode(replies[i * 3])
+        key_type = key_type if isinstance(key_type, str) else 'none'
+        types.append(key_type)
+        command = _LENGTH_COMMANDS.get(key_type)
+        if command:
+            getattr(pipe, command)(key)
+    lengths = iter(pipe.execute(raise_on_error=False))
+
+    result = []
+    for i, key in enumerate(keys):
+        key_type = types[i]
+        ttl = replies[i * 3 + 1]
+        memory_usage = replies[i * 3 + 2]
+        if not isinstance(memory_usage, int):
+            memory_usage = 0
+
+        key_length = 0
+        if key_type == 'string':
+            key_length = 1
+        elif key_type in _LENGTH_COMMANDS:
+            key_length = next(lengths)
+            if not isinstance(key_length, int):
+                key_length = 0
+
+        result.append({
+            'database_name': database_name,
+            'table_name': str(_decode(key)),
+            'table_type': f'REDIS_{key_type.upper()}',
+            'estimated_rows': key_length,
+            'size_mb': round(memory_usage / 1024 / 1024, 4) if memory_usage else 0,
+            'table_comment': f'Redis {key_type} key',
+            'created_at': None,
+            'updated_at': None,
+            'ttl_seconds': ttl if isinstance(ttl, int) and ttl > 0 else None,
+            'key_type': key_type,
+            'key_length': key_length
+        })
+    return result
+
+
+def _scan_pages(r, pattern, count, cursor=0):
+    """Yield (next_cursor, described keys) per SCAN batch"""
+    database_name = f"db_{r.connection_pool.connection_kwargs.get('db', 0)}"
+    while True:
+        cursor, keys = r.scan(cursor=cursor, match=pattern, count=count)
+        yield cursor, _describe_batch(r, keys, database_name) if keys else []
+        if cursor == 0:
+            return
+
+
+def iter_tables(connection_string, db_name=None, pattern='*', count=DEFAULT_SCAN_COUNT,
+                max_keys=DEFAULT_MAX_KEYS):
+    """
+    Stream key information batch by batch using incremental SCAN
+
+    Yields:
+        list: Key information dictionaries of one SCAN batch
+    """
+    r = _connect(connection_string, db_name)
+    seen = 0
+    for _, batch in _scan_pages(r, pattern, count):
+        if max_keys and seen + len(batch) >= max_keys:
+            yield batch[:max_keys - seen]
+            logger.info(f"Redis key listing stopped at sampling cap of {max_keys} keys")
+            return
+        seen += len(batch)
+        if batch:
+            yield batch
+
+
+def list_tables(connection_string, db_name=None, pattern='*', count=DEFAULT_SCAN_COUNT,
+                max_keys=DEFAULT_MAX_KEYS, cursor=None, page_size=None):
     """
-    List all keys in a Redis database
-    
+    List keys in a Redis database without blocking the server (SCAN, not KEYS)
+
     Args:
         connection_string (str): Redis connection string
         db_name (str): Database name (Redis database number, 0-15)
-    
+        pattern (str): Key pattern filter passed to SCAN MATCH
+        count (int): SCAN COUNT hint per round-trip
+        max_keys (int): Sampling cap for a full listing (0 = no cap)
+        cursor (str|int): Resume a paginated listing from this SCAN cursor
+        page_size (int): Return one page (about page_size keys) plus next_cursor
+
     Returns:
-        list: List of dictionaries containing key information
+        list: List of dictionaries containing key information, or
+        dict: {'tables', 'next_cursor'} when paginating
     """
     try:
-        # Parse connection string and connect to Redis
-        # Assuming connection_string format: redis://host:port/db
-        r = redis.from_url(connection_string)
-        
-        # If db_name is provided, select that database
-        if db_name is not None:
-            try:
-                db_num = int(db_name)
-                r.select(db_num)
-            except ValueError:
-                logger.warning(f"Invalid database number: {db_name}, using default")
-        
-        # Get all keys
-        keys = r.keys('*')
-        
-        result = []
-        for key in keys:
-            key_str = key.decode('utf-8') if isinstance(key, bytes) else str(key)
-            
-            # Get key information
-            key_type = r.type(key).decode('utf-8')
-            ttl = r.ttl(key)
-            
-            # Get memory usage if available
-            try:
-                memory_usage = r.memory_usage(key)
-            except:
-                memory_usage = 0
-            
-            # Get key length based on type
-            key_length = 0
-            try:
-                if key_type == 'string':
-                    key_length = 1
-                elif key_type == 'list':
-                    key_length = r.llen(key)
-                elif key_type == 'set':
-                    key_length = r.scard(key)
-                elif key_type == 'zset':
-                    key_length = r.zcard(key)
-                elif key_type == 'hash':
-                    key_length = r.hlen(key)
-            except:
-                key_length = 0
-            
-            key_info = {
-                'database_name': f"db_{r.connection_pool.connection_kwargs.get('db', 0)}",
-                'table_name': key_str,
-                'table_type': f'REDIS_{key_type.upper()}',
-                'estimated_rows': key_length,
-                'size_mb': round(memory_usage / 1024 / 1024, 4) if memory_usage else 0,
-                'table_comment': f'Redis {key_type} key',
-                'created_at': None,
-                'updated_at': None,
-                'ttl_seconds': ttl if ttl > 0 else None,
-                'key_type': key_type,
-                'key_length': key_length
+        if page_size or cursor is not None:
+            page_size = int(page_size or count)
+            count = min(count, page_size)
+            r = _connect(connection_string, db_name)
+            tables = []
+            next_cursor = 0
+            for next_cursor, batch in _scan_pages(r, pattern, count, int(cursor or 0)):
+                tables.extend(batch)
+                # pages end on a SCAN batch boundary so the cursor stays exact
+                if len(tables) >= page_size:
+                    break
+            return {
+                'tables': tables,
+                'next_cursor': str(next_cursor) if next_cursor else None
             }
-            result.append(key_info)
-        
+
+        result = [info for batch in iter_tables(connection_string, db_name, pattern, count, max_keys)
+                  for info in batch]
+
         # Sort by key name
         result.sort(key=lambda x: x['table_name'])
-        
+
         return result
-        
+
     except Exception as e:
         logger.error(f"Error listing Redis keys: {e}")
         return {"error": str(e)}
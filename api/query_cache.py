@@ -0,0 +1,283 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import bindparam, exc as sa_exc, text
+from sqlalchemy.engine import Connection, make_url
+
+from codec import dumps
+from db_executor import db_executor
+from settings import (
+    QUERY_CACHE_ENABLED,
+    QUERY_CACHE_MAX_BYTES,
+    QUERY_CACHE_POLL_INTERVAL,
+    QUERY_CACHE_TTL,
+)
+from sql_utils import is_select
+
+logger = logging.getLogger(__name__)
+
+# quoted literals/identifiers are kept verbatim, whitespace runs outside them collapse
+_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\s+")
+_TABLE_RE = re.compile(
+    r"\b(?:from|join)\s+((?:[`\"\[]?\w+[`\"\]]?\.)*[`\"\[]?\w+[`\"\]]?)",
+    re.IGNORECASE,
+)
+# results of these change on every call, so they are never cached
+_VOLATILE_RE = re.compile(
+    r"\b(?:now|sysdate|current_timestamp|current_date|current_time|localtimestamp|"
+    r"getdate|sysdatetime|rand|random|uuid|newid|gen_random_uuid)\b",
+    re.IGNORECASE,
+)
+
+_TABLE_VERSION_QUERIES = {
+    "mysql": text(
+        "SELECT table_name AS name, CAST(update_time AS CHAR) AS version "
+        "FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name IN :names"
+    ).bindparams(bindparam("names", expanding=True)),
+    "postgresql": text(
+        "SELECT relname AS name, "
+        "n_tup_ins || '/' || n_tup_upd || '/' || n_tup_del AS version "
+        "FROM pg_stat_user_tables WHERE relname IN :names "
+        "ORDER BY schemaname"
+    ).bindparams(bindparam("names", expanding=True)),
+}
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace outside quotes and drop a trailing ';'"""
+    normalized = _TOKEN_RE.sub(lambda m: " " if m.group(0).isspace() else m.group(0), sql)
+    return normalized.strip().rstrip(";").strip()
+
+
+def referenced_tables(statements: Iterable[str]) -> Set[str]:
+    """Lower-cased table names following FROM / JOIN (schema prefix dropped)"""
+    tables = set()
+    for statement in statements:
+        for match in _TABLE_RE.finditer(statement):
+            name = match.group(1).split(".")[-1].strip("`\"[]").lower()
+            if name and name != "dual":
+                tables.add(name)
+    return tables
+
+
+def table_versions(conn: Connection, tables: Set[str]) -> Optional[Dict[str, str]]:
+    """Change markers per table, None when the dialect has no cheap way to tell"""
+    query = _TABLE_VERSION_QUERIES.get(conn.dialect.name)
+    if query is None or not tables:
+        return None
+    if conn.dialect.name == "mysql":
+        # MySQL 8 otherwise serves update_time from a cache refreshed once a day
+        _set_stats_expiry(conn, "0")
+    try:
+        rows = conn.execute(query, {"names": sorted(tables)}).all()
+    finally:
+        if conn.dialect.name == "mysql":
+            _set_stats_expiry(conn, "DEFAULT")
+    versions: Dict[str, str] = {}
+    for row in rows:
+        name = str(row.name).lower()
+        # same name in several schemas: any of them changing invalidates
+        versions[name] = f"{versions[name]};{row.version}" if name in versions else str(row.version)
+    for name in tables:
+        versions.setdefault(name, "")
+    return versions
+
+
+def _set_stats_expiry(conn: Connection, value: str) -> None:
+    try:
+        conn.exec_driver_sql(f"SET SESSION information_schema_stats_expiry = {value}")
+    except sa_exc.DBAPIError:
+        # MySQL 5.7 / MariaDB have no stats cache (and no such variable)
+        pass
+
+
+def has_table_versions(connection_string: str) -> bool:
+    """True if the dialect has a cheap table change marker query"""
+    try:
+        return make_url(connection_string).get_backend_name() in _TABLE_VERSION_QUERIES
+    except Exception:
+        return False
+
+
+class _Entry:
+    __slots__ = ("value", "size", "created_at", "expires_at", "connection_string", "tables", "versions")
+
+    def __init__(self, value: Any, size: int, ttl: float, connection_string: str,
+                 tables: Set[str], versions: Optional[Dict[str, str]]):
+        self.value = value
+        self.size = size
+        self.created_at = time.monotonic()
+        self.expires_at = self.created_at + ttl
+        self.connection_string = connection_string
+        self.tables = tables
+        self.versions = versions
+
+
+class QueryResultCache:
+    """TTL + byte-bounded LRU cache of /query_sql results.
+
+    Keys hash the connection string, the normalized SQL and the result options.
+    Entries on MySQL / PostgreSQL also remember a change marker for every table
+    they read (``information_schema.tables.update_time`` / ``pg_stat_user_tables``
+    write counters); ``watch()`` polls those markers and drops entries whose
+    tables changed. Other dialects rely on the TTL alone.
+    """
+
+    def __init__(
+        self,
+        ttl: float = QUERY_CACHE_TTL,
+        max_bytes: int = QUERY_CACHE_MAX_BYTES,
+        poll_interval: float = QUERY_CACHE_POLL_INTERVAL,
+        enabled: bool = QUERY_CACHE_ENABLED,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        self.enabled = enabled and ttl > 0 and max_bytes > 0
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._bypasses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def cacheable(statements: List[str]) -> bool:
+        return all(is_select(s) and not _VOLATILE_RE.search(s) for s in statements)
+
+    @staticmethod
+    def key(connection_string: str, statements: List[str], options: Dict[str, Any]) -> str:
+        material = json.dumps(
+            [connection_string, [normalize_sql(s) for s in statements], options],
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+        if entry is not None:
+            self._drop(key)
+        self._misses += 1
+        return None
+
+    def record_bypass(self) -> None:
+        self._bypasses += 1
+
+    async def snapshot(self, connection_string: str, statements: List[str]) -> tuple:
+        """Tables read by a batch and their current change markers (taken before executing)"""
+        tables = referenced_tables(statements)
+        if not tables or not has_table_versions(connection_string):
+            # nothing to ask the DB: skip the pool checkout and limiter slot
+            return tables, None
+        try:
+            versions = await db_executor.run(connection_string, lambda conn: table_versions(conn, tables))
+        except Exception as e:
+            logger.warning(f"Could not read table versions: {e}")
+            versions = None
+        return tables, versions
+
+    def put(self, key: str, value: Any, connection_string: str,
+            tables: Set[str], versions: Optional[Dict[str, str]]) -> bool:
+        """Store a result; results larger than the whole budget are not cached"""
+        size = len(dumps(value))
+        if size > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = _Entry(value, size, self.ttl, connection_string, tables, versions)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._evictions += 1
+        return True
+
+    def invalidate(self, connection_string: Optional[str] = None) -> int:
+        """Drop entries of one connection (or everything); returns entries removed"""
+        keys = [
+            key for key, entry in self._entries.items()
+            if connection_string is None or entry.connection_string == connection_string
+        ]
+        for key in keys:
+            self._drop(key)
+        return len(keys)
+
+    async def poll(self) -> int:
+        """Compare stored change markers with the live ones; returns entries invalidated"""
+        now = time.monotonic()
+        tracked: Dict[str, Set[str]] = {}
+        for key, entry in list(self._entries.items()):
+            if entry.expires_at <= now:
+                self._drop(key)
+            elif entry.versions is not None:
+                tracked.setdefault(entry.connection_string, set()).update(entry.tables)
+
+        invalidated = 0
+        for connection_string, tables in tracked.items():
+            try:
+                current = await db_executor.run(
+                    connection_string, lambda conn, tables=tables: table_versions(conn, tables)
+                )
+            except Exception as e:
+                logger.warning(f"Error polling table versions: {e}")
+                continue
+            if current is None:
+                continue
+            for key, entry in list(self._entries.items()):
+                if entry.connection_string != connection_string or entry.versions is None:
+                    continue
+                if any(current.get(table) != version for table, version in entry.versions.items()):
+                    self._drop(key)
+                    invalidated += 1
+
+        self._invalidations += invalidated
+        if invalidated:
+            logger.info(f"Query cache: invalidated {invalidated} entries after table changes")
+        return invalidated
+
+    async def watch(self) -> None:
+        """Background task polling table change markers"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning(f"Error polling query cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "poll_interval": self.poll_interval,
+            "hits": self._hits,
+            "misses": self._misses,
+            "bypasses": self._bypasses,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+            "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+
+query_cache = QueryResultCache()
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from settings import QUERIES_DIR, QUERY_CATALOG_RELOAD_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# (operation, dialect dir) -> compiled statement; dialect None holds legacy top-level files
+CatalogKey = Tuple[str, Optional[str]]
+
+
+class QueryCatalog:
+    """In-memory catalog of SQL templates loaded from ``queries/<dialect>/*.sql``.
+
+    All files are read once into pre-built ``TextClause`` objects so lookups on the
+    request path never touch the filesystem. In dev mode ``watch`` polls file
+    mtimes in the background and swaps in a fresh catalog when something changes.
+    """
+
+    def __init__(self, base_dir: str = QUERIES_DIR):
+        self.base_dir = base_dir
+        self._queries: Dict[CatalogKey, TextClause] = {}
+        self._signature: Dict[str, float] = {}
+
+    def load(self) -> int:
+        """(Re)load every .sql template; returns the number of templates loaded"""
+        queries: Dict[CatalogKey, TextClause] = {}
+        signature: Dict[str, float] = {}
+
+        if not os.path.isdir(self.base_dir):
+            logger.warning(f"Query directory not found: {self.base_dir}")
+
+        for root, _, files in os.walk(self.base_dir):
+            rel = os.path.relpath(root, self.base_dir)
+            dialect = None if rel == "." else rel.replace(os.sep, "/")
+            for filename in files:
+                if not filename.endswith(".sql"):
+                    continue
+                path = os.path.join(root, filename)
+                with open(path, encoding="utf-8") as f:
+                    queries[(filename[:-4], dialect)] = text(f.read())
+                signature[path] = os.path.getmtime(path)
+
+        # swap in one assignment so concurrent readers never see a partial catalog
+        self._queries = queries
+        self._signature = signature
+        logger.info(f"Loaded {len(queries)} query templates from {self.base_dir}")
+        return len(queries)
+
+    def get(self, operation: str, dialect: str) -> Optional[TextClause]:
+        """Return the template for a dialect dir, falling back to a legacy top-level file"""
+        queries = self._queries
+        query = queries.get((operation, dialect))
+        if query is None:
+            query = queries.get((operation, None))
+        return query
+
+    def keys(self):
+        return list(self._queries.keys())
+
+    def has_changed(self) -> bool:
+        current: Dict[str, float] = {}
+        for root, _, files in os.walk(self.base_dir):
+            for filename in files:
+                if filename.endswith(".sql"):
+                    path = os.path.join(root, filename)
+                    current[path] = os.path.getmtime(path)
+        return current != self._signature
+
+    async def watch(self, interval: float = QUERY_CATALOG_RELOAD_INTERVAL) -> None:
+        """Reload the catalog whenever a template file changes (dev mode only)"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await asyncio.to_thread(self.has_changed):
+                    await asyncio.to_thread(self.load)
+            except Exception as e:
+                logger.warning(f"Error reloading query catalog: {e}")
+
+
+query_catalog = QueryCatalog()
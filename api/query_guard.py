@@ -0,0 +1,215 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Connection.info key of the guard watching the connection's current work
+_GUARD_KEY = "query_guard"
+
+
+class QueryTimeout(Exception):
+    """DB work ran past its ``timeout_ms`` deadline and was cancelled"""
+
+
+class QueryCancelled(Exception):
+    """Raised on the next statement once a guard has been cancelled"""
+
+
+class QueryGuard:
+    """Deadline plus server-side cancel handle for one unit of DB work.
+
+    ``wrap(work)`` runs inside the worker thread (or ``run_sync`` greenlet): it
+    applies the dialect's native statement timeout and remembers how to cancel
+    the running statement. ``cancel()`` can then be called from any thread:
+
+    - mysql: ``SET SESSION MAX_EXECUTION_TIME`` / ``KILL QUERY <thread id>``
+    - postgresql: ``set_config('statement_timeout', .., true)`` / ``pg_cancel_backend``
+    - mssql (pyodbc): ``Connection.timeout`` / ``Cursor.cancel()``
+    - oracle: ``callTimeout`` / ``Connection.cancel()``
+    - sqlite: a progress handler checking the deadline and the cancel flag
+
+    After a cancel, further statements on the connection raise ``QueryCancelled``
+    so a batch stops instead of running its remaining statements.
+    """
+
+    def __init__(self, connection_string: str, timeout_ms: Optional[int] = None):
+        self.connection_string = connection_string
+        self.timeout_ms = timeout_ms or None
+        self.deadline = None if self.timeout_ms is None else time.monotonic() + self.timeout_ms / 1000
+        self.cancelled = False
+        # set once the dialect's own timeout is in place
+        self.native_timeout = False
+        self.dialect: Optional[str] = None
+        self.cursor = None
+        self._driver = None
+        self._server_id: Optional[int] = None
+        self._restore: Optional[Callable[[], None]] = None
+        self._armed = False
+        self._lock = threading.Lock()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, None without one"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def wrap(self, work: Callable[[Connection], T]) -> Callable[[Connection], T]:
+        def guarded(conn: Connection) -> T:
+            self.arm(conn)
+            try:
+                return work(conn)
+            finally:
+                self.disarm(conn)
+
+        return guarded
+
+    def arm(self, conn: Connection) -> None:
+        """Apply the native timeout and record the statement's cancel target"""
+        if self.cancelled or self.expired():
+            raise QueryCancelled("Query cancelled before it started")
+        self.dialect = conn.dialect.name
+        self._driver = conn.connection.driver_connection
+        conn.info[_GUARD_KEY] = self
+        try:
+            self._apply(conn, None if self.deadline is None else max(int(self.remaining() * 1000), 1))
+        except Exception:
+            conn.info.pop(_GUARD_KEY, None)
+            raise
+        with self._lock:
+            self._armed = True
+
+    def disarm(self, conn: Connection) -> None:
+        # under the lock, so a concurrent cancel never hits the connection's next user
+        with self._lock:
+            self._armed = False
+        conn.info.pop(_GUARD_KEY, None)
+        self.cursor = None
+        if self._restore is not None:
+            try:
+                self._restore()
+            except Exception as e:
+                # the connection was probably killed; pre-ping replaces it
+                logger.warning(f"Could not reset statement timeout on {self.dialect}: {e}")
+            self._restore = None
+
+    def cancel(self) -> bool:
+        """Stop the running statement (blocking); True if a cancel was sent"""
+        self.cancelled = True
+        with self._lock:
+            if not self._armed:
+                return False
+            try:
+                return self._cancel()
+            except Exception as e:
+                logger.warning(f"Could not cancel {self.dialect} query: {e}")
+                return False
+
+    def _apply(self, conn: Connection, timeout_ms: Optional[int]) -> None:
+        driver = self._driver
+        if self.dialect == "mysql":
+            self._server_id = _call(driver, "thread_id")
+            if self._server_id is None:
+                self._server_id = conn.exec_driver_sql("SELECT CONNECTION_ID()").scalar()
+            if timeout_ms:
+                # applies to read-only SELECTs, which is all /query_sql runs
+                conn.exec_driver_sql(f"SET SESSION MAX_EXECUTION_TIME = {int(timeout_ms)}")
+                self._restore = lambda: conn.exec_driver_sql("SET SESSION MAX_EXECUTION_TIME = DEFAULT")
+                self.native_timeout = True
+        elif self.dialect == "postgresql":
+            self._server_id = _call(driver, "get_backend_pid") or _call(driver, "get_server_pid")
+            if timeout_ms:
+                # transaction-local, reset when the connection goes back to the pool
+                conn.execute(text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": str(int(timeout_ms))})
+                self.native_timeout = True
+            if self._server_id is None:
+                self._server_id = conn.exec_driver_sql("SELECT pg_backend_pid()").scalar()
+        elif self.dialect == "mssql":
+            if timeout_ms and hasattr(driver, "timeout"):
+                previous = driver.timeout
+                # pyodbc query timeout is in whole seconds
+                driver.timeout = max(math.ceil(timeout_ms / 1000), 1)
+                self._restore = lambda: setattr(driver, "timeout", previous)
+                self.native_timeout = True
+        elif self.dialect == "oracle":
+            attr = "call_timeout" if hasattr(driver, "call_timeout") else "callTimeout"
+            if timeout_ms and hasattr(driver, attr):
+                previous = getattr(driver, attr)
+                setattr(driver, attr, int(timeout_ms))
+                self._restore = lambda: setattr(driver, attr, previous)
+                self.native_timeout = True
+        elif self.dialect == "sqlite":
+            # aiosqlite connections belong to their own thread; those are only interrupted
+            if isinstance(driver, sqlite3.Connection) and timeout_ms:
+                driver.set_progress_handler(lambda: self.cancelled or self.expired(), 1000)
+                self._restore = lambda: driver.set_progress_handler(None, 0)
+                self.native_timeout = True
+
+    def _cancel(self) -> bool:
+        driver = self._driver
+        if self.dialect == "mysql" and self._server_id is not None:
+            _run_on_side_connection(self.connection_string, f"KILL QUERY {int(self._server_id)}")
+            return True
+        if self.dialect == "postgresql":
+            if hasattr(driver, "cancel") and hasattr(driver, "get_backend_pid"):
+                # psycopg2 sends the cancel request itself, no extra connection
+                driver.cancel()
+                return True
+            if self._server_id is not None:
+                _run_on_side_connection(self.connection_string, f"SELECT pg_cancel_backend({int(self._server_id)})")
+                return True
+        if self.dialect == "mssql" and self.cursor is not None and hasattr(self.cursor, "cancel"):
+            self.cursor.cancel()
+            return True
+        if self.dialect == "oracle" and hasattr(driver, "cancel"):
+            driver.cancel()
+            return True
+        if self.dialect == "sqlite":
+            # sqlite3 itself, or the one wrapped by aiosqlite
+            raw = driver if isinstance(driver, sqlite3.Connection) else getattr(driver, "_conn", None)
+            if isinstance(raw, sqlite3.Connection):
+                raw.interrupt()
+                return True
+        return False
+
+
+def _call(obj: Any, name: str) -> Any:
+    fn = getattr(obj, name, None)
+    if not callable(fn):
+        return None
+    try:
+        return fn()
+    except Exception:
+        return None
+
+
+def _run_on_side_connection(connection_string: str, statement: str) -> None:
+    # unpooled: the target's pool may be exhausted by the very queries being cancelled
+    engine = create_engine(connection_string, poolclass=NullPool)
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql(statement)
+    finally:
+        engine.dispose()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    guard = conn.info.get(_GUARD_KEY)
+    if guard is None:
+        return
+    if guard.cancelled:
+        raise QueryCancelled("Query cancelled")
+    guard.cursor = cursor
@@ -0,0 +1,111 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import Response
+
+from metrics import phase
+
+logger = logging.getLogger(__name__)
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+RESULT_FORMATS = ("rows", "columnar", "arrow")
+
+_TYPE_NAMES = (
+    (bool, "bool"),
+    (int, "int"),
+    (float, "float"),
+    (Decimal, "decimal"),
+    (str, "string"),
+    (datetime, "datetime"),
+    (date, "date"),
+    (time, "time"),
+    (timedelta, "interval"),
+    ((bytes, bytearray, memoryview), "bytes"),
+)
+
+
+def check_format(fmt: Optional[str]) -> str:
+    """Normalize the requested result format ("rows" when omitted)"""
+    fmt = (fmt or "rows").lower()
+    if fmt not in RESULT_FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of {', '.join(RESULT_FORMATS)}")
+    return fmt
+
+
+def encode(columns: List[str], rows: Sequence[Sequence[Any]], fmt: str) -> Any:
+    """Encode fetched rows as dict-per-row, columnar arrays or Arrow IPC bytes"""
+    with phase("serialize"):
+        if fmt == "columnar":
+            return to_columnar(columns, rows)
+        if fmt == "arrow":
+            return to_arrow_ipc(columns, rows)
+        return [dict(zip(columns, row)) for row in rows]
+
+
+def encode_result(result, fmt: str) -> Any:
+    """Fetch every row of a SQLAlchemy result and encode it"""
+    if not result.returns_rows:
+        return encode([], [], fmt)
+    return encode(list(result.keys()), result.fetchall(), fmt)
+
+
+def encode_records(records: List[Dict[str, Any]], fmt: str) -> Any:
+    """Encode a list of dicts (e.g. NoSQL adapter output); columns follow first appearance"""
+    columns: List[str] = []
+    for record in records:
+        for name in record:
+            if name not in columns:
+                columns.append(name)
+    return encode(columns, [tuple(record.get(name) for name in columns) for record in records], fmt)
+
+
+def to_columnar(columns: List[str], rows: Sequence[Sequence[Any]]) -> Dict[str, Any]:
+    """Column names once plus one value array per column"""
+    data = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+    return {
+        "columns": columns,
+        "types": [_type_name(values) for values in data],
+        "data": data,
+        "row_count": len(rows),
+    }
+
+
+def to_arrow_ipc(columns: List[str], rows: Sequence[Sequence[Any]]) -> bytes:
+    """Serialize rows as an Arrow IPC stream (requires pyarrow)"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("format=arrow requires the 'pyarrow' package")
+
+    data = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+    arrays = []
+    for name, values in zip(columns, data):
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # mixed-type columns fall back to strings
+            logger.warning(f"Column '{name}' has mixed types, encoding as string")
+            arrays.append(pa.array([None if v is None else str(v) for v in values], type=pa.string()))
+    table = pa.Table.from_arrays(arrays, names=columns)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_response(payload: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=payload, media_type=ARROW_MEDIA_TYPE, headers=headers)
+
+
+def _type_name(values: List[Any]) -> Optional[str]:
+    for value in values:
+        if value is None:
+            continue
+        for types, name in _TYPE_NAMES:
+            if isinstance(value, types):
+                return name
+        return type(value).__name__
+    return None
@@ -1,17 +1,30 @@
-from fastapi import HTTPException, Request
-from typing import Dict, Any
-import httpx, json, logging
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import AsyncIterator, Dict, Any
+from contextlib import AsyncExitStack
+import httpx, logging, math
+from urllib.parse import quote
 from datetime import datetime
 
 from models import DatabaseType
-from settings import PROXY_TARGETS
+from settings import PROXY_TARGETS, SELF_DISPATCH_MODE, VAULT_SECRET_NAME
 from connstr_builder import ConnectionStringBuilder
+from vault_cache import VaultConfigCache, TenantConfig
+from http_clients import http_clients
+from dispatch import dispatcher
+from result_format import ARROW_MEDIA_TYPE
+from metrics import phase, set_db_type
+from codec import FastJSONResponse, dumps, loads
+from tenant_scheduler import TenantThrottled, tenant_scheduler
 
 logger = logging.getLogger(__name__)
 
 class UniversalProxyService:
     def __init__(self):
         self.connection_builder = ConnectionStringBuilder()
+        self.vault_cache = VaultConfigCache()
+        self.self_dispatch_mode = SELF_DISPATCH_MODE
 
     async def execute_universal_flow(
         self,
@@ -32,36 +45,79 @@ class UniversalProxyService:
             uuid, name = await self._extract_required_fields(request)
             logger.info(f"Step 1: Extracted UUID: {uuid}")
             
-            # Step 2-3: Get config and connection string (only if UUID exists)
-            connection_string = None
+            # Fair share of proxy capacity per tenant; 429 + Retry-After past its quota and queue
+            async with AsyncExitStack() as tenant_slot:
+                await tenant_slot.enter_async_context(tenant_scheduler.slot(uuid))
+                # Step 2-3: Get config and connection string (only if UUID exists)
+                connection_string = None
             
-            if uuid and name:
-                try:
-                    db_config = await self._get_db_config_from_vault(uuid, client)
-                    logger.info(f"Step 2: Retrieved DB config from Vault")
-                    
-                    if db_config:
-                        connection_string = self._generate_connection_string(db_config)
-                        logger.info(f"Step 3: Generated connection string for {db_config.get('type', 'mysql')}")
-                        logger.info(f"Step 3: Connection string: {connection_string}")
-                except Exception as e:
-                    logger.warning(f"Failed to get DB config: {str(e)}")
-                    # Continue without config
-            
-            # Step 4: Forward request to API (always)
-            modified_request = await self._modifier_request(request, connection_string)
-            result = await self._forward_request(modified_request, client)
-            logger.info(f"Step 4: Forwarded request to API")
-            
-            # Step 5: Return result
-            return {
-                "uuid": uuid,
-                "connection_string": connection_string,
-                "result": result,
-                "timestamp": datetime.now().isoformat(),
-                "status": "success"
-            }
+                if uuid and name:
+                    try:
+                        with phase("vault"):
+                            tenant = await self.vault_cache.get(
+                                uuid, lambda: self._load_tenant_config(uuid, http_clients.get("vault"))
+                            )
+                        logger.info(f"Step 2: Retrieved DB config for UUID {uuid}")
+
+                        if tenant:
+                            db_config, connection_string = tenant
+                            set_db_type(db_config.get('type', 'mysql'))
+                            logger.info(f"Step 3: Using connection string for {db_config.get('type', 'mysql')}")
+                    except Exception as e:
+                        logger.warning(f"Failed to get DB config: {str(e)}")
+                        # Continue without config
+            
+                # Step 4: Forward request to API (always)
+                modified_request = await self._modifier_request(request, connection_string)
+                with phase("forward"):
+                    result = await self._forward_request(modified_request, client)
+                logger.info(f"Step 4: Forwarded request to API")
+
+                # JSON responses carrying headers (e.g. X-Cache) are unwrapped into the envelope
+                relay_headers = getattr(modified_request, '_relay_headers', {})
+                status_code = 200
+                if isinstance(result, JSONResponse):
+                    # e.g. 503 + Retry-After when the target DB is shedding load
+                    status_code = result.status_code
+                    if isinstance(result, FastJSONResponse):
+                        # in-process responses are not rendered yet: take the object and headers as given
+                        relay_headers = self._relay_headers(result.extra_headers)
+                        result = result.payload
+                    else:
+                        relay_headers = self._relay_headers(result.headers)
+                        result = loads(result.body)
+
+                # Streamed results (e.g. NDJSON from /query_sql) are passed through as-is
+                if isinstance(result, StreamingResponse):
+                    # the rows are fetched while the body is sent: keep the slot until then
+                    result.body_iterator = self._release_after(result.body_iterator, tenant_slot.pop_all())
+                    return result
+                if isinstance(result, Response):
+                    return result
+            
+                # Step 5: Return result
+                envelope = {
+                    "uuid": uuid,
+                    "connection_string": connection_string,
+                    "result": result,
+                    "timestamp": datetime.now().isoformat(),
+                    "status": "success" if status_code < 400 else "failed"
+                }
+                return FastJSONResponse(content=envelope, status_code=status_code, headers=relay_headers or None)
             
+        except TenantThrottled as e:
+            logger.warning(str(e))
+            return FastJSONResponse(
+                status_code=429,
+                content={
+                    "error": str(e),
+                    "reason": e.reason,
+                    "retry_after": round(e.retry_after, 3),
+                    "timestamp": datetime.now().isoformat(),
+                    "status": "throttled"
+                },
+                headers={"Retry-After": str(max(math.ceil(e.retry_after), 1))}
+            )
         except Exception as e:
             logger.error(f"Error in universal flow: {str(e)}")
             return {
@@ -70,6 +126,13 @@ class UniversalProxyService:
                 "status": "failed"
             }
 
+    @staticmethod
+    async def _release_after(body: AsyncIterator, slot: AsyncExitStack) -> AsyncIterator:
+        """Relay a streamed body, releasing the tenant slot once it is sent (or abandoned)"""
+        async with slot:
+            async for chunk in body:
+                yield chunk
+
     async def _extract_uuid(self, request: Request) -> str | None:
         """Get UUID from request - flexible, return None if not found"""
         # Try headers first
@@ -81,7 +144,7 @@ class UniversalProxyService:
                 try:
                     body = await request.body()
                     if body:
-                        body_data = json.loads(body)
+                        body_data = loads(body)
                         uuid = body_data.get("uuid")
                 except:
                     pass
@@ -99,7 +162,7 @@ class UniversalProxyService:
             body = await request.body()
             if not body:
                 raise HTTPException(status_code=400, detail="Request body is required and must include 'uuid' and 'name'")
-            data = json.loads(body)
+            data = loads(body)
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid JSON body. Must include 'uuid' and 'name'")
 
@@ -132,7 +195,7 @@ class UniversalProxyService:
             body_json = await request.body()
             if body_json:
                 try:
-                    body_json = json.loads(body_json)
+                    body_json = loads(body_json)
                 except:
                     body_json = {}
 
@@ -140,7 +203,8 @@ class UniversalProxyService:
         if connection_string:
             body_json["connection_string"] = connection_string
         
-        request._modified_body = json.dumps(body_json).encode()
+        # Encoded lazily: in-process dispatch hands the dict over as-is
+        request._modified_json = body_json
         
         return request
     
@@ -148,7 +212,7 @@ class UniversalProxyService:
         self,
         request: Request,
         client: httpx.AsyncClient
-    ) -> Dict[str, Any]:
+    ) -> Dict[str, Any] | Response:
         """Forward the request to API (with optional connection_string)"""
         try:
             # Get the full path after the first segment
@@ -159,6 +223,11 @@ class UniversalProxyService:
                 operation = '/'.join(path_parts[1:])
             else:
                 operation = "database"
+
+            # "self" operations in inprocess mode skip the loopback HTTP hop
+            if self.self_dispatch_mode == "inprocess" and dispatcher.resolve(operation):
+                logger.info(f"Dispatching in-process: {operation}")
+                return await dispatcher.dispatch(request, operation, request._modified_json)
             
             base_url = PROXY_TARGETS["self"]
             target_url = f"{base_url}/{operation}"
@@ -178,7 +247,8 @@ class UniversalProxyService:
             connection_string = getattr(request, '_connection_string', None)
             
             # Always use modified body for POST/PUT/PATCH
-            request_body = getattr(request, '_modified_body', None)
+            modified_json = getattr(request, '_modified_json', None)
+            request_body = dumps(modified_json) if modified_json is not None else None
 
             # Prepare body and params based on method
             params = dict(request.query_params)
@@ -187,6 +257,25 @@ class UniversalProxyService:
             if connection_string:
                 headers["X-Connection-String"] = connection_string
             
+            # Streaming responses are relayed chunk by chunk instead of buffered
+            if modified_json and modified_json.get("stream"):
+                upstream = await client.send(
+                    client.build_request(
+                        method="POST",
+                        url=target_url,
+                        headers=headers,
+                        content=request_body,
+                        params=params
+                    ),
+                    stream=True
+                )
+                return StreamingResponse(
+                    upstream.aiter_raw(),
+                    status_code=upstream.status_code,
+                    media_type=upstream.headers.get("content-type"),
+                    background=BackgroundTask(upstream.aclose)
+                )
+
             # Forward the request - let httpx handle Content-Length automatically
             response = await client.request(
                 method=request.method,
@@ -213,8 +302,23 @@ class UniversalProxyService:
                     params=params
                 )
 
+            # Binary Arrow IPC results are relayed untouched
+            if response.headers.get("content-type", "").startswith(ARROW_MEDIA_TYPE):
+                return Response(
+                    content=response.content,
+                    status_code=response.status_code,
+                    media_type=ARROW_MEDIA_TYPE,
+                    headers=self._relay_headers(response.headers)
+                )
+
+            request._relay_headers = self._relay_headers(response.headers)
+            if response.status_code == 503:
+                # keep the status so the envelope tells callers to back off
+                return FastJSONResponse(content=loads(response.content), status_code=503,
+                                        headers=request._relay_headers)
+
             try:
-                return response.json()
+                return loads(response.content)
             except:
                 content = await response.aread()
                 return {
@@ -226,23 +330,42 @@ class UniversalProxyService:
             logger.error(f"Error forwarding request: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Request forwarding failed: {str(e)}")
     
+    @staticmethod
+    def _relay_headers(headers) -> Dict[str, str]:
+        """Upstream X-* (and Retry-After) response headers worth passing back to the caller"""
+        return {k: v for k, v in headers.items() if k.lower().startswith("x-") or k.lower() == "retry-after"}
+
+    async def _load_tenant_config(self, uuid: str, client: httpx.AsyncClient) -> TenantConfig | None:
+        """Fetch DB config from Vault and build its connection string (cache loader)"""
+        db_config = await self._get_db_config_from_vault(uuid, client)
+        if not db_config:
+            return None
+        with phase("connstr_build", db_config.get('type', 'mysql')):
+            connection_string = self._generate_connection_string(db_config)
+        logger.info(f"Step 3: Generated connection string for {db_config.get('type', 'mysql')}")
+        return db_config, connection_string
+
     def _generate_connection_string(self, db_config: Dict[str, Any]) -> str:
         """Create connection string using ConnectionStringBuilder"""
         return self.connection_builder.generate_connection_string(db_config)
 
-    async def _get_db_config_from_vault(self, uuid: str, client: httpx.AsyncClient) -> Dict[str, Any]:
-        """Get DB config from Vault"""
+    async def _get_db_config_from_vault(self, uuid: str, client: httpx.AsyncClient) -> Dict[str, Any] | None:
+        """Get DB config from Vault, None if the UUID has no config"""
         try:
             vault_url = PROXY_TARGETS["vault"]
             logger.info(f"Getting DB config from Vault: {vault_url}")
-            response = await client.get(f"{vault_url}/secrets?user_id={uuid}&include_values=true&name=string")
+            # direct read of the one secret, not a listing of the user's subtree
+            response = await client.get(
+                f"{vault_url}/secrets/{quote(uuid, safe='')}/{quote(VAULT_SECRET_NAME, safe='')}",
+                params={"include_values": "true"},
+            )
             
             if response.status_code == 200:
-                vault_data = response.json()
-                logger.info(f"Vault data: {vault_data}")
-                return vault_data[0].get("data", {})
+                return response.json().get("data") or {}
+            elif response.status_code == 404:
+                return None
             else:
-                raise HTTPException(status_code=404, detail="DB config not found in Vault")
+                raise HTTPException(status_code=502, detail=f"Vault returned status {response.status_code}")
             
         except Exception as e:
             logger.error(f"Error getting DB config from Vault for UUID {uuid}: {str(e)}")
@@ -4,4 +4,125 @@ import os
 PROXY_TARGETS = {
     "self": os.getenv("SELF_API_URL"),
     "vault": os.getenv("VAULT_SERVICE_URL")
-}
\ No newline at end of file
+}
+
+def _env_bool(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "y")
+
+# SQLAlchemy engine registry (one pooled engine per connection string)
+ENGINE_POOL_SIZE = int(os.getenv("ENGINE_POOL_SIZE", "5"))
+ENGINE_MAX_OVERFLOW = int(os.getenv("ENGINE_MAX_OVERFLOW", "10"))
+ENGINE_POOL_TIMEOUT = float(os.getenv("ENGINE_POOL_TIMEOUT", "30"))
+ENGINE_POOL_PRE_PING = _env_bool("ENGINE_POOL_PRE_PING", "true")
+ENGINE_POOL_RECYCLE = int(os.getenv("ENGINE_POOL_RECYCLE", "1800"))
+ENGINE_IDLE_TIMEOUT = float(os.getenv("ENGINE_IDLE_TIMEOUT", "600"))
+ENGINE_MAX_ENGINES = int(os.getenv("ENGINE_MAX_ENGINES", "64"))
+
+# Query template catalog
+QUERIES_DIR = os.getenv("QUERIES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "queries"))
+QUERY_CATALOG_RELOAD = _env_bool("QUERY_CATALOG_RELOAD")
+QUERY_CATALOG_RELOAD_INTERVAL = float(os.getenv("QUERY_CATALOG_RELOAD_INTERVAL", "2"))
+
+# Vault secret holding each UUID's DB config, read at {VAULT_SERVICE_URL}/secrets/{uuid}/{name}
+VAULT_SECRET_NAME = os.getenv("VAULT_SECRET_NAME", "string")
+
+# Vault DB config cache (uuid -> db_config + connection string)
+VAULT_CACHE_TTL = float(os.getenv("VAULT_CACHE_TTL", "300"))
+VAULT_CACHE_NEGATIVE_TTL = float(os.getenv("VAULT_CACHE_NEGATIVE_TTL", "30"))
+VAULT_CACHE_MAX_SIZE = int(os.getenv("VAULT_CACHE_MAX_SIZE", "1024"))
+
+# Shared outbound HTTP clients (one per PROXY_TARGETS entry)
+HTTP_CLIENT_TIMEOUT = float(os.getenv("HTTP_CLIENT_TIMEOUT", "30"))
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "100"))
+HTTP_CLIENT_MAX_KEEPALIVE = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", "20"))
+HTTP_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "30"))
+HTTP_CLIENT_HTTP2 = _env_bool("HTTP_CLIENT_HTTP2")
+
+# How "self" operations are executed: "inprocess" calls the handler directly,
+# "http" forwards over loopback to SELF_API_URL
+SELF_DISPATCH_MODE = os.getenv("SELF_DISPATCH_MODE", "inprocess").lower()
+
+# DB execution off the event loop
+DB_EXECUTOR_MAX_WORKERS = int(os.getenv("DB_EXECUTOR_MAX_WORKERS", "32"))
+DB_CONCURRENCY_DEFAULT = int(os.getenv("DB_CONCURRENCY_DEFAULT", "16"))
+# e.g. "mysql=16,postgresql=16,mssql=8,oracle=8,sqlite=4"
+DB_CONCURRENCY_LIMITS = {
+    dialect.strip(): int(limit)
+    for dialect, limit in (
+        item.split("=", 1) for item in os.getenv("DB_CONCURRENCY_LIMITS", "").split(",") if "=" in item
+    )
+}
+# Use asyncmy/asyncpg/aiosqlite when installed ("auto") or never ("off")
+DB_ASYNC_DRIVERS = os.getenv("DB_ASYNC_DRIVERS", "auto").lower()
+
+# /query_sql streaming (NDJSON)
+QUERY_STREAM_BATCH_SIZE = int(os.getenv("QUERY_STREAM_BATCH_SIZE", "500"))
+QUERY_STREAM_BUFFER = int(os.getenv("QUERY_STREAM_BUFFER", "64"))
+
+# /query_sql row caps and paging (held server-side cursors)
+QUERY_MAX_ROWS = int(os.getenv("QUERY_MAX_ROWS", "10000"))
+QUERY_CURSOR_TTL = float(os.getenv("QUERY_CURSOR_TTL", "120"))
+QUERY_MAX_CURSORS = int(os.getenv("QUERY_MAX_CURSORS", "20"))
+# each held cursor pins a connection of its target's pool; keep half the pool free
+QUERY_MAX_CURSORS_PER_TARGET = int(os.getenv(
+    "QUERY_MAX_CURSORS_PER_TARGET", str(max((ENGINE_POOL_SIZE + ENGINE_MAX_OVERFLOW) // 2, 1))
+))
+QUERY_MAX_PARALLEL = int(os.getenv("QUERY_MAX_PARALLEL", "4"))
+
+# /query_sql result cache (TTL + byte-bounded LRU, table change polling)
+QUERY_CACHE_ENABLED = _env_bool("QUERY_CACHE_ENABLED", "true")
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "30"))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+QUERY_CACHE_POLL_INTERVAL = float(os.getenv("QUERY_CACHE_POLL_INTERVAL", "2"))
+
+# Shared MongoDB / Redis clients for the NoSQL adapters (one pool per URI)
+NOSQL_MONGO_MAX_POOL_SIZE = int(os.getenv("NOSQL_MONGO_MAX_POOL_SIZE", "50"))
+NOSQL_MONGO_MIN_POOL_SIZE = int(os.getenv("NOSQL_MONGO_MIN_POOL_SIZE", "0"))
+NOSQL_MONGO_MAX_IDLE_TIME_MS = int(os.getenv("NOSQL_MONGO_MAX_IDLE_TIME_MS", "300000"))
+NOSQL_REDIS_MAX_CONNECTIONS = int(os.getenv("NOSQL_REDIS_MAX_CONNECTIONS", "50"))
+NOSQL_REDIS_POOL_TIMEOUT = float(os.getenv("NOSQL_REDIS_POOL_TIMEOUT", "20"))
+NOSQL_CLIENT_IDLE_TIMEOUT = float(os.getenv("NOSQL_CLIENT_IDLE_TIMEOUT", "600"))
+NOSQL_MAX_CLIENTS = int(os.getenv("NOSQL_MAX_CLIENTS", "64"))
+
+# /diagnostics/snapshot: per-check timeout (seconds)
+DIAGNOSTICS_CHECK_TIMEOUT = float(os.getenv("DIAGNOSTICS_CHECK_TIMEOUT", "10"))
+
+# Coalesce identical concurrent read-only operations (same tenant, op, params)
+REQUEST_COALESCING = _env_bool("REQUEST_COALESCING", "true")
+
+# Statement timeouts: default timeout_ms for /query_sql and operations (0 = none),
+# upper bound on what callers may ask for (0 = no cap), and how long cancelled
+# work may take to unwind before the request gives up on it (seconds)
+QUERY_TIMEOUT_MS = int(os.getenv("QUERY_TIMEOUT_MS", "0"))
+QUERY_MAX_TIMEOUT_MS = int(os.getenv("QUERY_MAX_TIMEOUT_MS", "0"))
+QUERY_CANCEL_GRACE = float(os.getenv("QUERY_CANCEL_GRACE", "5"))
+
+# Per-target adaptive concurrency limit (AIMD) and circuit breaker; a target is
+# backend + host + port + database. Over the limit, calls queue up to
+# TARGET_QUEUE_TIMEOUT seconds, then get a 503 like an open breaker.
+TARGET_LIMITER_ENABLED = _env_bool("TARGET_LIMITER_ENABLED", "true")
+TARGET_LIMIT_INITIAL = int(os.getenv("TARGET_LIMIT_INITIAL", "8"))
+TARGET_LIMIT_MIN = int(os.getenv("TARGET_LIMIT_MIN", "1"))
+TARGET_LIMIT_MAX = int(os.getenv("TARGET_LIMIT_MAX", "32"))
+TARGET_LATENCY_TOLERANCE = float(os.getenv("TARGET_LATENCY_TOLERANCE", "2.0"))
+TARGET_QUEUE_TIMEOUT = float(os.getenv("TARGET_QUEUE_TIMEOUT", "5"))
+TARGET_BREAKER_FAILURES = int(os.getenv("TARGET_BREAKER_FAILURES", "5"))
+TARGET_BREAKER_COOLDOWN = float(os.getenv("TARGET_BREAKER_COOLDOWN", "30"))
+TARGET_BREAKER_PROBES = int(os.getenv("TARGET_BREAKER_PROBES", "1"))
+TARGET_MAX_TRACKED = int(os.getenv("TARGET_MAX_TRACKED", "1024"))
+
+# Per-tenant (UUID) fair admission of proxied requests: total and per-tenant
+# concurrency, per-tenant queue bound / max wait (seconds) before a 429, and
+# weights as "uuid=weight,..." (default weight 1)
+TENANT_SCHEDULER_ENABLED = _env_bool("TENANT_SCHEDULER_ENABLED", "true")
+TENANT_CAPACITY = int(os.getenv("TENANT_CAPACITY", "64"))
+TENANT_MAX_CONCURRENCY = int(os.getenv("TENANT_MAX_CONCURRENCY", "8"))
+TENANT_MAX_QUEUE = int(os.getenv("TENANT_MAX_QUEUE", "32"))
+TENANT_QUEUE_TIMEOUT = float(os.getenv("TENANT_QUEUE_TIMEOUT", "10"))
+TENANT_WEIGHTS = {
+    tenant.strip(): float(weight)
+    for tenant, weight in (
+        item.split("=", 1) for item in os.getenv("TENANT_WEIGHTS", "").split(",") if "=" in item
+    )
+}
+TENANT_MAX_TRACKED = int(os.getenv("TENANT_MAX_TRACKED", "1024"))
@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "abandoned")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls into one execution.
+
+    The first caller for a key starts the work; callers arriving while it is in
+    flight await the same task and receive the same result (or exception).
+    A cancelled caller leaves the work running for the others, but once every
+    caller has gone away the work itself is cancelled. Nothing is kept once
+    the call finishes, so this is not a cache.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._calls = 0
+        self._executions = 0
+        self._coalesced = 0
+        self._abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn()`` unless an identical call is in flight, then share its outcome"""
+        self._calls += 1
+        flight = self._inflight.get(key)
+        if flight is None or flight.abandoned:
+            # an abandoned call is still unwinding its cancellation: start afresh
+            self._executions += 1
+            flight = _Flight(asyncio.ensure_future(self._run(key, fn)))
+            self._inflight[key] = flight
+        else:
+            self._coalesced += 1
+
+        flight.waiters += 1
+        try:
+            # shield so a cancelled caller does not cancel the call for other waiters
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # last caller gone: nobody wants the result any more
+                self._abandoned += 1
+                flight.abandoned = True
+                flight.task.cancel()
+                # like an uncoalesced call, wait for the work (and its server-side cancel) to unwind
+                await asyncio.gather(flight.task, return_exceptions=True)
+            raise
+        finally:
+            flight.waiters -= 1
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        try:
+            return await fn()
+        finally:
+            flight = self._inflight.get(key)
+            if flight is not None and flight.task is asyncio.current_task():
+                del self._inflight[key]
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Stable key from JSON-able parts (dict order does not matter)"""
+        material = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self._calls,
+            "executions": self._executions,
+            "coalesced": self._coalesced,
+            "abandoned": self._abandoned,
+            "inflight": len(self._inflight),
+            "coalesced_ratio": round(self._coalesced / self._calls, 4) if self._calls else 0.0,
+        }
@@ -0,0 +1,13 @@
+import re
+from typing import List
+
+_SELECT_RE = re.compile(r"^\s*select", re.IGNORECASE)
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a SQL batch on ';' and drop empty statements"""
+    return [stmt.strip() for stmt in sql.split(';') if stmt.strip()]
+
+
+def is_select(statement: str) -> bool:
+    return bool(_SELECT_RE.match(statement))
@@ -0,0 +1,109 @@
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from codec import dumps
+from db_executor import StreamClosed, db_executor
+from settings import QUERY_STREAM_BATCH_SIZE
+from sql_utils import is_select
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_line(obj: Any) -> bytes:
+    return dumps(obj) + b"\n"
+
+
+def column_metadata(result) -> List[dict]:
+    """Column names plus the driver's type code from the DBAPI cursor description"""
+    description = getattr(result.cursor, "description", None) or []
+    types = {col[0]: col[1] for col in description}
+    columns = []
+    for name in result.keys():
+        type_code = types.get(name)
+        columns.append({
+            "name": name,
+            "type_code": None if type_code is None else str(type_code),
+        })
+    return columns
+
+
+def _statement_producer(statements: List[str], batch_size: int) -> Callable[[Connection, Callable[[Any], None]], None]:
+    def produce(conn: Connection, emit: Callable[[Any], None]) -> None:
+        for i, statement in enumerate(statements):
+            query_index = i + 1
+            if not is_select(statement):
+                emit(ndjson_line({
+                    "type": "error",
+                    "query_index": query_index,
+                    "sql": statement,
+                    "error": "Only SELECT allowed",
+                }))
+                continue
+
+            started = time.perf_counter()
+            row_count = 0
+            try:
+                result = conn.execution_options(
+                    stream_results=True, yield_per=batch_size
+                ).execute(text(statement))
+                emit(ndjson_line({
+                    "type": "header",
+                    "query_index": query_index,
+                    "sql": statement,
+                    "columns": column_metadata(result),
+                }))
+                for partition in result.partitions():
+                    # one chunk per fetched batch keeps thread/loop handoffs low
+                    emit(b"".join(
+                        ndjson_line({"type": "row", "query_index": query_index, "data": dict(row._mapping)})
+                        for row in partition
+                    ))
+                    row_count += len(partition)
+                emit(ndjson_line({
+                    "type": "trailer",
+                    "query_index": query_index,
+                    "row_count": row_count,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+                }))
+            except StreamClosed:
+                raise
+            except Exception as e:
+                logger.error(f"Error streaming statement {query_index}: {e}")
+                emit(ndjson_line({
+                    "type": "error",
+                    "query_index": query_index,
+                    "sql": statement,
+                    "error": str(e),
+                    "row_count": row_count,
+                }))
+
+    return produce
+
+
+async def stream_statements(
+    connection_string: str,
+    statements: List[str],
+    batch_size: int = QUERY_STREAM_BATCH_SIZE,
+    timeout_ms: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """Yield NDJSON chunks: per statement a header, its rows and a trailer"""
+    started = time.perf_counter()
+    try:
+        async for chunk in db_executor.stream(
+            connection_string, _statement_producer(statements, batch_size), timeout_ms=timeout_ms
+        ):
+            yield chunk
+    except Exception as e:
+        logger.error(f"Error streaming SQL query: {e}")
+        yield ndjson_line({"type": "error", "error": str(e)})
+    yield ndjson_line({
+        "type": "end",
+        "total_queries": len(statements),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    })
@@ -0,0 +1,351 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import make_url
+
+from metrics import db_target_rejections
+from query_guard import QueryCancelled, QueryTimeout
+from settings import (
+    TARGET_BREAKER_COOLDOWN,
+    TARGET_BREAKER_FAILURES,
+    TARGET_BREAKER_PROBES,
+    TARGET_LATENCY_TOLERANCE,
+    TARGET_LIMIT_INITIAL,
+    TARGET_LIMIT_MAX,
+    TARGET_LIMIT_MIN,
+    TARGET_LIMITER_ENABLED,
+    TARGET_MAX_TRACKED,
+    TARGET_QUEUE_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# connection errors of the optional NoSQL clients, matched by module and name so
+# pymongo and redis stay optional (pymongo ConnectionFailure covers AutoReconnect,
+# NetworkTimeout and ServerSelectionTimeoutError; redis BusyLoadingError is a
+# ConnectionError)
+_CLIENT_FAILURES = {"pymongo": {"ConnectionFailure"}, "redis": {"ConnectionError", "TimeoutError"}}
+
+# latency samples below this are noise, never a congestion signal (seconds)
+_LATENCY_FLOOR = 0.05
+
+
+def is_target_failure(error: BaseException) -> bool:
+    """Connection-level errors that say the target is unhealthy.
+
+    Errors of a statement the target did answer (bad SQL, unknown column,
+    constraint violations, a statement timeout) do not count, and neither do
+    caller-requested ``timeout_ms`` cancellations.
+    """
+    if isinstance(error, sa_exc.DBAPIError):
+        # no statement: the error was raised while connecting
+        return error.connection_invalidated or error.statement is None \
+            or isinstance(error, sa_exc.InterfaceError)
+    if isinstance(error, sa_exc.TimeoutError):
+        # pool checkout timed out
+        return True
+    if isinstance(error, (QueryTimeout, QueryCancelled)):
+        return False
+    if isinstance(error, ConnectionError):
+        return True
+    for cls in type(error).__mro__:
+        package = cls.__module__.split(".", 1)[0]
+        if cls.__name__ in _CLIENT_FAILURES.get(package, ()):
+            return True
+    return False
+
+
+def target_key(connection_string: str) -> str:
+    """Identify a target DB by backend, host, port and database (credentials dropped)"""
+    try:
+        url = make_url(connection_string)
+        port = f":{url.port}" if url.port else ""
+        return f"{url.get_backend_name()}://{url.host or ''}{port}/{url.database or ''}"
+    except Exception:
+        scheme = connection_string.split("://", 1)[0] if "://" in connection_string else "unknown"
+        return f"{scheme}://{hashlib.sha256(connection_string.encode('utf-8')).hexdigest()[:16]}"
+
+
+class TargetUnavailable(Exception):
+    """A target DB is shedding load: breaker open or concurrency limit reached"""
+
+    def __init__(self, target: str, reason: str, retry_after: float):
+        self.target = target
+        self.reason = reason
+        self.retry_after = max(retry_after, 0.0)
+        messages = {
+            OPEN: "circuit breaker open after repeated failures",
+            HALF_OPEN: "circuit breaker probing recovery",
+            "overloaded": "concurrency limit reached",
+        }
+        super().__init__(f"Target {target} unavailable: {messages.get(reason, reason)}; "
+                         f"retry after {self.retry_after:.1f}s")
+
+
+class _Target:
+    __slots__ = ("key", "db_type", "state", "limit", "inflight", "waiters", "consecutive_failures",
+                 "opened_at", "probes", "latency", "baseline", "successes", "failures", "rejected",
+                 "trips")
+
+    def __init__(self, key: str, limit: float):
+        self.key = key
+        self.db_type = key.split("://", 1)[0]
+        self.state = CLOSED
+        self.limit = limit
+        self.inflight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.latency: Optional[float] = None
+        self.baseline: Optional[float] = None
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+
+
+class TargetCall:
+    """An admitted call; its executor marks when the work actually starts"""
+    __slots__ = ("started",)
+
+    def __init__(self):
+        self.started: Optional[float] = None
+
+    def start(self) -> None:
+        if self.started is None:
+            self.started = time.monotonic()
+
+    def elapsed(self) -> Optional[float]:
+        return None if self.started is None else time.monotonic() - self.started
+
+
+class TargetLimiter:
+    """Per-target-DB adaptive concurrency limit (AIMD) plus circuit breaker.
+
+    Each target (backend/host/port/database) gets an in-flight limit that grows
+    by one while the window is in use and latency stays within
+    ``latency_tolerance`` x its moving baseline, and shrinks multiplicatively on
+    slow samples (x0.9) and target failures (x0.5). Callers over the limit wait
+    up to ``queue_timeout`` seconds, then get ``TargetUnavailable``.
+
+    ``breaker_failures`` consecutive failures open the breaker: calls fail
+    fast for ``breaker_cooldown`` seconds, then up to ``breaker_probes`` calls
+    are let through; a successful probe closes it, a failed one reopens it.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = TARGET_LIMITER_ENABLED,
+        initial_limit: int = TARGET_LIMIT_INITIAL,
+        min_limit: int = TARGET_LIMIT_MIN,
+        max_limit: int = TARGET_LIMIT_MAX,
+        latency_tolerance: float = TARGET_LATENCY_TOLERANCE,
+        queue_timeout: float = TARGET_QUEUE_TIMEOUT,
+        breaker_failures: int = TARGET_BREAKER_FAILURES,
+        breaker_cooldown: float = TARGET_BREAKER_COOLDOWN,
+        breaker_probes: int = TARGET_BREAKER_PROBES,
+        max_tracked: int = TARGET_MAX_TRACKED,
+    ):
+        self.enabled = enabled
+        self.initial_limit = initial_limit
+        self.min_limit = max(min_limit, 1)
+        self.max_limit = max(max_limit, self.min_limit)
+        self.latency_tolerance = latency_tolerance
+        self.queue_timeout = queue_timeout
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.breaker_probes = max(breaker_probes, 1)
+        self.max_tracked = max_tracked
+        self._targets: "OrderedDict[str, _Target]" = OrderedDict()
+
+    @asynccontextmanager
+    async def acquire(self, connection_string: str, measure_latency: bool = True):
+        """Hold one in-flight slot of the target, recording the outcome on exit.
+
+        Yields a call handle: latency is sampled from ``call.start()``, so time
+        spent in local queues after admission does not count against the target.
+        """
+        call = TargetCall()
+        if not self.enabled:
+            yield call
+            return
+
+        target = self._target(target_key(connection_string))
+        probe = await self._admit(target)
+        try:
+            yield call
+        except asyncio.CancelledError:
+            # caller went away: says nothing about the target
+            if probe:
+                target.probes -= 1
+            raise
+        except (QueryTimeout, QueryCancelled):
+            # the caller's own deadline: neither a failure nor a latency sample
+            if probe:
+                target.probes -= 1
+            raise
+        except Exception as e:
+            # errors the target answered (e.g. bad SQL) show it is up, but their
+            # timing is no latency sample
+            self._record(target, None, is_target_failure(e), probe)
+            raise
+        else:
+            self._record(target, call.elapsed() if measure_latency else None, False, probe)
+        finally:
+            target.inflight -= 1
+            self._wake(target)
+
+    async def _admit(self, target: _Target) -> bool:
+        """Take a slot or raise ``TargetUnavailable``; True when the call is a half-open probe"""
+        if target.state == OPEN:
+            remaining = target.opened_at + self.breaker_cooldown - time.monotonic()
+            if remaining > 0:
+                self._reject(target, OPEN, remaining)
+            target.state = HALF_OPEN
+            target.probes = 0
+            logger.info(f"Circuit breaker half-open for {target.key}")
+
+        if target.state == HALF_OPEN:
+            if target.probes >= self.breaker_probes:
+                self._reject(target, HALF_OPEN, self.breaker_cooldown)
+            target.probes += 1
+            target.inflight += 1
+            return True
+
+        if target.inflight >= int(target.limit):
+            deadline = time.monotonic() + self.queue_timeout
+            while target.inflight >= int(target.limit):
+                if target.state != CLOSED:
+                    # the breaker opened while this call was queued
+                    self._reject(target, target.state, self.breaker_cooldown)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._reject(target, "overloaded", 1.0)
+                waiter = asyncio.get_running_loop().create_future()
+                target.waiters.append(waiter)
+                try:
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    if waiter in target.waiters:
+                        target.waiters.remove(waiter)
+        target.inflight += 1
+        return False
+
+    def _record(self, target: _Target, elapsed: Optional[float], failed: bool, probe: bool) -> None:
+        if failed:
+            target.failures += 1
+            target.consecutive_failures += 1
+            target.limit = max(self.min_limit, target.limit * 0.5)
+            if probe or (target.state == CLOSED and target.consecutive_failures >= self.breaker_failures):
+                self._open(target)
+            return
+
+        target.successes += 1
+        target.consecutive_failures = 0
+        if probe and target.state == HALF_OPEN:
+            target.state = CLOSED
+            target.probes = 0
+            logger.info(f"Circuit breaker closed for {target.key}")
+        if elapsed is None:
+            # no latency sample (the work never started, or was not measured)
+            return
+
+        target.latency = elapsed if target.latency is None else 0.8 * target.latency + 0.2 * elapsed
+        target.baseline = elapsed if target.baseline is None else 0.95 * target.baseline + 0.05 * elapsed
+        if elapsed > _LATENCY_FLOOR and elapsed > target.baseline * self.latency_tolerance:
+            target.limit = max(self.min_limit, target.limit * 0.9)
+        elif target.inflight * 2 >= target.limit:
+            # only grow while the current window is actually used
+            target.limit = min(self.max_limit, target.limit + 1)
+
+    def _open(self, target: _Target) -> None:
+        target.state = OPEN
+        target.opened_at = time.monotonic()
+        target.probes = 0
+        target.trips += 1
+        logger.warning(f"Circuit breaker open for {target.key} after "
+                       f"{target.consecutive_failures} consecutive failures")
+        # queued callers would only hit the same failing target
+        for waiter in target.waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _reject(self, target: _Target, reason: str, retry_after: float) -> None:
+        target.rejected += 1
+        db_target_rejections.inc(db_type=target.db_type, reason=reason)
+        raise TargetUnavailable(target.key, reason, retry_after)
+
+    @staticmethod
+    def _wake(target: _Target) -> None:
+        while target.waiters and target.inflight < int(target.limit):
+            waiter = target.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def _target(self, key: str) -> _Target:
+        target = self._targets.get(key)
+        if target is None:
+            target = _Target(key, float(max(min(self.initial_limit, self.max_limit), self.min_limit)))
+            self._targets[key] = target
+            self._evict()
+        self._targets.move_to_end(key)
+        return target
+
+    def _evict(self) -> None:
+        # forget the least recently used idle, closed targets beyond the cap
+        for key in list(self._targets):
+            if len(self._targets) <= self.max_tracked:
+                return
+            target = self._targets[key]
+            if target.inflight == 0 and target.state == CLOSED:
+                del self._targets[key]
+
+    def reset(self, connection_string: Optional[str] = None) -> int:
+        """Forget limiter / breaker state of one target (or all idle targets)"""
+        keys = [target_key(connection_string)] if connection_string else list(self._targets)
+        removed = 0
+        for key in keys:
+            target = self._targets.get(key)
+            if target is not None and target.inflight == 0:
+                del self._targets[key]
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        targets = {}
+        for key, target in self._targets.items():
+            targets[key] = {
+                "state": target.state,
+                "limit": round(target.limit, 2),
+                "inflight": target.inflight,
+                "waiting": len(target.waiters),
+                "latency_ms": None if target.latency is None else round(target.latency * 1000, 3),
+                "baseline_ms": None if target.baseline is None else round(target.baseline * 1000, 3),
+                "consecutive_failures": target.consecutive_failures,
+                "successes": target.successes,
+                "failures": target.failures,
+                "rejected": target.rejected,
+                "trips": target.trips,
+            }
+        return {
+            "enabled": self.enabled,
+            "limits": {"initial": self.initial_limit, "min": self.min_limit, "max": self.max_limit},
+            "breaker": {"failures": self.breaker_failures, "cooldown": self.breaker_cooldown,
+                        "probes": self.breaker_probes},
+            "targets": targets,
+        }
+
+
+target_limiter = TargetLimiter()
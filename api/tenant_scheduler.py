@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Optional
+
+from metrics import tenant_queue_wait, tenant_rejections
+from settings import (
+    TENANT_CAPACITY,
+    TENANT_MAX_CONCURRENCY,
+    TENANT_MAX_QUEUE,
+    TENANT_MAX_TRACKED,
+    TENANT_QUEUE_TIMEOUT,
+    TENANT_SCHEDULER_ENABLED,
+    TENANT_WEIGHTS,
+)
+
+logger = logging.getLogger(__name__)
+
+# metric label of tenants without a configured weight: uuids are client-supplied
+# (and not yet validated by Vault), so they must not each become a series
+OTHER_TENANTS = "other"
+
+
+class TenantThrottled(Exception):
+    """A tenant is over its quota and its queue is full (or the wait timed out)"""
+
+    def __init__(self, tenant: str, reason: str, retry_after: float):
+        self.tenant = tenant
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"Too many requests for tenant {tenant} ({reason}); retry after {retry_after:.1f}s")
+
+
+class _Waiter:
+    __slots__ = ("future", "start_tag", "enqueued_at")
+
+    def __init__(self, future: asyncio.Future, start_tag: float):
+        self.future = future
+        self.start_tag = start_tag
+        self.enqueued_at = time.monotonic()
+
+
+class _Tenant:
+    __slots__ = ("tenant", "weight", "active", "queue", "last_finish", "hold_time",
+                 "admitted", "queued", "rejected", "wait_total", "wait_max")
+
+    def __init__(self, tenant: str, weight: float):
+        self.tenant = tenant
+        self.weight = weight
+        self.active = 0
+        self.queue: Deque[_Waiter] = deque()
+        self.last_finish = 0.0
+        self.hold_time: Optional[float] = None
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class TenantScheduler:
+    """Weighted fair admission of proxied requests per tenant (UUID).
+
+    At most ``capacity`` requests run at once, and at most ``max_concurrency``
+    per tenant. Requests beyond that queue per tenant (up to ``max_queue``, for
+    at most ``queue_timeout`` seconds). Freed slots go to the queued request
+    with the smallest start tag (start-time fair queuing): every request
+    advances its tenant's tag by ``1 / weight``, so a burst from one UUID
+    queues behind other tenants' requests instead of starving them.
+
+    Metrics label only tenants listed in ``weights``; the rest share the
+    ``other`` label.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = TENANT_SCHEDULER_ENABLED,
+        capacity: int = TENANT_CAPACITY,
+        max_concurrency: int = TENANT_MAX_CONCURRENCY,
+        max_queue: int = TENANT_MAX_QUEUE,
+        queue_timeout: float = TENANT_QUEUE_TIMEOUT,
+        weights: Optional[Dict[str, float]] = None,
+        max_tracked: int = TENANT_MAX_TRACKED,
+    ):
+        self.enabled = enabled
+        self.capacity = max(capacity, 1)
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.weights = dict(TENANT_WEIGHTS if weights is None else weights)
+        self.max_tracked = max_tracked
+        self._tenants: "OrderedDict[str, _Tenant]" = OrderedDict()
+        self._active = 0
+        self._virtual_time = 0.0
+
+    @asynccontextmanager
+    async def slot(self, tenant: str):
+        """Hold one of the tenant's slots for the duration of a request"""
+        if not self.enabled:
+            yield
+            return
+
+        state = await self._acquire(tenant)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - started
+            state.hold_time = held if state.hold_time is None else 0.8 * state.hold_time + 0.2 * held
+            state.active -= 1
+            self._active -= 1
+            self._dispatch()
+
+    async def _acquire(self, tenant: str) -> _Tenant:
+        state = self._tenant(tenant)
+        start_tag = max(self._virtual_time, state.last_finish)
+        state.last_finish = start_tag + 1.0 / state.weight
+
+        if not state.queue and state.active < self.max_concurrency and self._active < self.capacity \
+                and not self._others_waiting(start_tag):
+            self._grant(state, start_tag, 0.0)
+            return state
+
+        if len(state.queue) >= self.max_queue:
+            # the tag was never used; give it back
+            state.last_finish -= 1.0 / state.weight
+            self._reject(state, "queue_full")
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), start_tag)
+        state.queue.append(waiter)
+        state.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                # granted in the same loop turn the wait expired
+                return state
+            state.queue.remove(waiter)
+            self._reject(state, "queue_timeout")
+        except asyncio.CancelledError:
+            if waiter.future.done():
+                # granted just as the caller went away: hand the slot on
+                state.active -= 1
+                self._active -= 1
+                self._dispatch()
+            else:
+                state.queue.remove(waiter)
+            raise
+        return state
+
+    def _others_waiting(self, start_tag: float) -> bool:
+        """True if a dispatchable request of another tenant is ahead of ``start_tag``"""
+        return any(
+            s.queue and s.active < self.max_concurrency and s.queue[0].start_tag <= start_tag
+            for s in self._tenants.values()
+        )
+
+    def _grant(self, state: _Tenant, start_tag: float, waited: float) -> None:
+        state.active += 1
+        state.admitted += 1
+        state.wait_total += waited
+        state.wait_max = max(state.wait_max, waited)
+        self._active += 1
+        self._virtual_time = max(self._virtual_time, start_tag)
+        tenant_queue_wait.observe(waited, tenant=self.metric_label(state.tenant))
+
+    def _dispatch(self) -> None:
+        """Hand free slots to queued requests in start-tag order"""
+        while self._active < self.capacity:
+            best: Optional[_Tenant] = None
+            for state in self._tenants.values():
+                if state.queue and state.active < self.max_concurrency and (
+                        best is None or state.queue[0].start_tag < best.queue[0].start_tag):
+                    best = state
+            if best is None:
+                return
+            waiter = best.queue.popleft()
+            if waiter.future.done():
+                continue
+            self._grant(best, waiter.start_tag, time.monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    def _reject(self, state: _Tenant, reason: str) -> None:
+        state.rejected += 1
+        tenant_rejections.inc(tenant=self.metric_label(state.tenant), reason=reason)
+        # roughly when one of the tenant's slots frees up for this request
+        hold = state.hold_time or 1.0
+        retry_after = max(hold * (len(state.queue) + 1) / self.max_concurrency, 1.0)
+        raise TenantThrottled(state.tenant, reason, retry_after)
+
+    def metric_label(self, tenant: str) -> str:
+        return tenant if tenant in self.weights else OTHER_TENANTS
+
+    def _tenant(self, tenant: str) -> _Tenant:
+        state = self._tenants.get(tenant)
+        if state is None:
+            self._evict()
+            state = _Tenant(tenant, max(float(self.weights.get(tenant, 1.0)), 0.01))
+            self._tenants[tenant] = state
+        self._tenants.move_to_end(tenant)
+        return state
+
+    def _evict(self) -> None:
+        for tenant in list(self._tenants):
+            if len(self._tenants) < self.max_tracked:
+                return
+            state = self._tenants[tenant]
+            if state.active == 0 and not state.queue:
+                del self._tenants[tenant]
+
+    def stats(self) -> Dict[str, Any]:
+        tenants = {}
+        for tenant, state in self._tenants.items():
+            tenants[tenant] = {
+                "weight": state.weight,
+                "active": state.active,
+                "queue_depth": len(state.queue),
+                "admitted": state.admitted,
+                "queued": state.queued,
+                "rejected": state.rejected,
+                "wait_avg_ms": round(state.wait_total / state.admitted * 1000, 3) if state.admitted else 0.0,
+                "wait_max_ms": round(state.wait_max * 1000, 3),
+                "hold_avg_ms": None if state.hold_time is None else round(state.hold_time * 1000, 3),
+            }
+        return {
+            "enabled": self.enabled,
+            "capacity": self.capacity,
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "tenants": tenants,
+        }
+
+
+tenant_scheduler = TenantScheduler()
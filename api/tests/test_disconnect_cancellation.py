@@ -0,0 +1,68 @@
+import asyncio
+import json
+import sqlite3
+import time
+
+from sqlalchemy import text
+from starlette.requests import Request
+
+import main
+from db_executor import db_executor
+from metrics import db_cancellations
+from query_catalog import query_catalog
+
+# a cross join of 1200-row tables runs for many seconds
+SLOW_QUERY = "SELECT count(*) FROM t a, t b, t c"
+
+
+def _database(tmp_path) -> str:
+    path = tmp_path / "slow.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(1200)])
+    conn.commit()
+    conn.close()
+    return f"sqlite:///{path}"
+
+
+def _request(payload: dict, disconnect_after: float) -> Request:
+    """A request whose client goes away ``disconnect_after`` seconds after sending its body"""
+    messages = [{"type": "http.request", "body": json.dumps(payload).encode(), "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    scope = {"type": "http", "method": "POST", "path": "/health_check", "headers": [], "query_string": b""}
+    return Request(scope, receive)
+
+
+def _disconnects() -> float:
+    return db_cancellations._values.get(("sqlite", "disconnect"), 0.0)
+
+
+def test_disconnect_cancels_coalesced_operation(tmp_path, monkeypatch):
+    connection_string = _database(tmp_path)
+    monkeypatch.setattr(main, "REQUEST_COALESCING", True)
+    monkeypatch.setitem(query_catalog._queries, ("health_check", "sqlite"), text(SLOW_QUERY))
+    before = _disconnects()
+
+    async def scenario():
+        payload = {"connection_string": connection_string}
+        started = time.monotonic()
+        # identical requests share one execution; both clients go away
+        responses = await asyncio.gather(
+            main.check_health(_request(payload, 0.3)),
+            main.check_health(_request(payload, 0.3)),
+        )
+        # measured while the loop runs: shutting it down would cancel leftover work anyway
+        return responses, _disconnects(), time.monotonic() - started
+
+    responses, disconnects, elapsed = asyncio.run(scenario())
+
+    assert disconnects == before + 1
+    assert db_executor.stats()["dialects"]["sqlite"]["cancellations"] >= 1
+    assert elapsed < 3
+    assert all("disconnected" in response["error"] for response in responses)
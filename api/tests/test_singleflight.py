@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_identical_calls_share_one_execution():
+    flights = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.02)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["result"] * 5
+    assert len(runs) == 1
+    assert flights.stats()["coalesced"] == 4
+    assert flights.stats()["inflight"] == 0
+
+
+def test_cancelled_caller_leaves_work_running_for_others():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(0.05)
+            return "result"
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        first = asyncio.ensure_future(flights.do("key", work))
+        second = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "result"
+    assert cancelled == []
+    assert flights.stats()["abandoned"] == 0
+
+
+def test_last_cancelled_caller_cancels_the_work():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def scenario():
+        callers = [asyncio.ensure_future(flights.do("key", work)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert cancelled == [1]
+    assert flights.stats()["abandoned"] == 1
+    assert flights.stats()["inflight"] == 0
+
+
+def test_caller_after_abandon_starts_a_fresh_call():
+    flights = SingleFlight()
+
+    async def slow_unwind():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            # cancellation still unwinding when the next caller arrives
+            await asyncio.sleep(0.02)
+            raise
+
+    async def work():
+        return "fresh"
+
+    async def scenario():
+        caller = asyncio.ensure_future(flights.do("key", slow_unwind))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        return await flights.do("key", work)
+
+    assert asyncio.run(scenario()) == "fresh"
+    assert flights.stats()["executions"] == 2
@@ -0,0 +1,230 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, exc as sa_exc, text
+
+from query_guard import QueryCancelled, QueryTimeout
+from target_limiter import CLOSED, HALF_OPEN, OPEN, TargetLimiter, TargetUnavailable, is_target_failure, target_key
+
+CS = "sqlite:////tmp/target-limiter-test.db"
+
+
+def _limiter(**kwargs) -> TargetLimiter:
+    options = dict(enabled=True, initial_limit=8, min_limit=1, max_limit=32, latency_tolerance=2.0,
+                   queue_timeout=0.2, breaker_failures=3, breaker_cooldown=30, breaker_probes=1)
+    options.update(kwargs)
+    return TargetLimiter(**options)
+
+
+def _sql_error(sql: str, url: str = "sqlite://") -> sa_exc.DBAPIError:
+    try:
+        with create_engine(url).connect() as conn:
+            conn.execute(text(sql))
+    except sa_exc.DBAPIError as e:
+        return e
+    raise AssertionError("statement did not fail")
+
+
+async def _raise_in(limiter: TargetLimiter, error: BaseException) -> None:
+    with pytest.raises(type(error)):
+        async with limiter.acquire(CS):
+            raise error
+
+
+def _state(limiter: TargetLimiter) -> dict:
+    return limiter.stats()["targets"][target_key(CS)]
+
+
+def test_target_failure_classification():
+    assert is_target_failure(_sql_error("select 1", "sqlite:////nonexistent-dir/x.db"))
+    assert is_target_failure(sa_exc.TimeoutError("pool exhausted"))
+    assert is_target_failure(ConnectionRefusedError())
+
+    assert not is_target_failure(_sql_error("select nosuchcol"))
+    assert not is_target_failure(_sql_error("selec 1"))
+    assert not is_target_failure(QueryTimeout("caller deadline"))
+    assert not is_target_failure(QueryCancelled("cancelled"))
+    assert not is_target_failure(asyncio.TimeoutError())
+    assert not is_target_failure(ValueError("bad input"))
+
+
+def test_sql_errors_never_open_the_breaker():
+    limiter = _limiter()
+
+    async def scenario():
+        for _ in range(10):
+            await _raise_in(limiter, _sql_error("select nosuchcol"))
+        async with limiter.acquire(CS):
+            pass
+
+    asyncio.run(scenario())
+    state = _state(limiter)
+    assert state["state"] == CLOSED
+    assert state["failures"] == 0
+    assert state["limit"] >= 8
+
+
+def test_caller_timeouts_leave_limit_and_breaker_alone():
+    limiter = _limiter()
+
+    async def scenario():
+        for _ in range(10):
+            await _raise_in(limiter, QueryTimeout("Query exceeded timeout_ms=10"))
+
+    asyncio.run(scenario())
+    state = _state(limiter)
+    assert state["state"] == CLOSED
+    assert state["limit"] == 8
+    assert state["failures"] == 0
+    assert state["latency_ms"] is None
+
+
+def test_failures_halve_limit_and_open_breaker():
+    limiter = _limiter()
+
+    async def scenario():
+        for _ in range(3):
+            await _raise_in(limiter, sa_exc.TimeoutError("pool exhausted"))
+        with pytest.raises(TargetUnavailable) as info:
+            async with limiter.acquire(CS):
+                pass
+        return info.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.reason == OPEN
+    assert 0 < rejected.retry_after <= 30
+    state = _state(limiter)
+    assert state["state"] == OPEN
+    assert state["limit"] == 1
+    assert state["trips"] == 1
+
+
+def test_success_resets_consecutive_failures():
+    limiter = _limiter()
+
+    async def scenario():
+        for _ in range(2):
+            await _raise_in(limiter, ConnectionRefusedError())
+        async with limiter.acquire(CS):
+            pass
+        for _ in range(2):
+            await _raise_in(limiter, ConnectionRefusedError())
+
+    asyncio.run(scenario())
+    assert _state(limiter)["state"] == CLOSED
+
+
+def test_half_open_probe_closes_or_reopens():
+    limiter = _limiter(breaker_cooldown=0.05)
+
+    async def trip():
+        for _ in range(3):
+            await _raise_in(limiter, ConnectionRefusedError())
+        await asyncio.sleep(0.06)
+
+    async def failed_probe():
+        await trip()
+        await _raise_in(limiter, ConnectionRefusedError())
+
+    asyncio.run(failed_probe())
+    assert _state(limiter)["state"] == OPEN
+    assert _state(limiter)["trips"] == 2
+
+    async def successful_probe():
+        await asyncio.sleep(0.06)
+        async with limiter.acquire(CS):
+            # a second call while the single probe is in flight is refused
+            with pytest.raises(TargetUnavailable) as info:
+                async with limiter.acquire(CS):
+                    pass
+            assert info.value.reason == HALF_OPEN
+
+    asyncio.run(successful_probe())
+    assert _state(limiter)["state"] == CLOSED
+
+
+def test_timed_out_probe_frees_the_probe_slot():
+    limiter = _limiter(breaker_cooldown=0.05)
+
+    async def scenario():
+        for _ in range(3):
+            await _raise_in(limiter, ConnectionRefusedError())
+        await asyncio.sleep(0.06)
+        await _raise_in(limiter, QueryTimeout("caller deadline"))
+        async with limiter.acquire(CS):
+            pass
+
+    asyncio.run(scenario())
+    assert _state(limiter)["state"] == CLOSED
+
+
+def test_limit_grows_while_window_is_used():
+    limiter = _limiter(initial_limit=2)
+
+    async def hold():
+        async with limiter.acquire(CS) as call:
+            call.start()
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        for _ in range(5):
+            await asyncio.gather(hold(), hold())
+
+    asyncio.run(scenario())
+    assert _state(limiter)["limit"] > 2
+
+
+def test_latency_is_sampled_from_the_start_of_the_work():
+    limiter = _limiter()
+
+    async def scenario():
+        async with limiter.acquire(CS):
+            # never started (e.g. cancelled while queued locally): no sample
+            await asyncio.sleep(0.05)
+        assert _state(limiter)["latency_ms"] is None
+        async with limiter.acquire(CS) as call:
+            # waiting for an executor slot or worker thread is not the target's latency
+            await asyncio.sleep(0.2)
+            call.start()
+            await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    state = _state(limiter)
+    assert 5 <= state["latency_ms"] < 100
+    assert state["limit"] == 8
+
+
+def test_calls_over_the_limit_queue_then_get_rejected():
+    limiter = _limiter(initial_limit=1, max_limit=1, queue_timeout=0.05)
+    order = []
+
+    async def hold(name, delay):
+        async with limiter.acquire(CS):
+            order.append(name)
+            await asyncio.sleep(delay)
+
+    async def scenario():
+        # the second call waits for the first one's slot
+        await asyncio.gather(hold("first", 0.01), hold("second", 0))
+        first = asyncio.ensure_future(hold("slow", 0.2))
+        await asyncio.sleep(0)
+        with pytest.raises(TargetUnavailable) as info:
+            await hold("rejected", 0)
+        await first
+        return info.value
+
+    rejected = asyncio.run(scenario())
+    assert order == ["first", "second", "slow"]
+    assert rejected.reason == "overloaded"
+    assert _state(limiter)["rejected"] == 1
+
+
+def test_disabled_limiter_tracks_nothing():
+    limiter = _limiter(enabled=False)
+
+    async def scenario():
+        for _ in range(5):
+            await _raise_in(limiter, ConnectionRefusedError())
+
+    asyncio.run(scenario())
+    assert limiter.stats()["targets"] == {}
@@ -0,0 +1,55 @@
+import asyncio
+import json
+
+from fastapi.responses import StreamingResponse
+from starlette.requests import Request
+
+import services
+from services import UniversalProxyService
+from tenant_scheduler import TenantScheduler
+
+
+def _request(payload: dict) -> Request:
+    messages = [{"type": "http.request", "body": json.dumps(payload).encode(), "more_body": False}]
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    scope = {"type": "http", "method": "POST", "path": "/proxy/query_sql", "headers": [], "query_string": b""}
+    return Request(scope, receive)
+
+
+def test_streamed_response_holds_tenant_slot(monkeypatch):
+    scheduler = TenantScheduler(enabled=True, capacity=4, max_concurrency=1, weights={})
+    monkeypatch.setattr(services, "tenant_scheduler", scheduler)
+    service = UniversalProxyService()
+
+    async def no_config(uuid, loader):
+        return None
+
+    active = []
+
+    async def rows():
+        for i in range(3):
+            # rows are fetched only while the body is sent
+            active.append(scheduler.stats()["active"])
+            yield f"{i}\n".encode()
+
+    async def forward(request, client):
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+    monkeypatch.setattr(service.vault_cache, "get", no_config)
+    monkeypatch.setattr(service, "_forward_request", forward)
+
+    async def scenario():
+        response = await service.execute_universal_flow(_request({"uuid": "u1", "name": "n", "stream": True}), None)
+        returned = scheduler.stats()["active"]
+        body = [chunk async for chunk in response.body_iterator]
+        return returned, body, scheduler.stats()["active"]
+
+    returned, body, after = asyncio.run(scenario())
+
+    assert returned == 1
+    assert active == [1, 1, 1]
+    assert body == [b"0\n", b"1\n", b"2\n"]
+    assert after == 0
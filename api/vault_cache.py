@@ -0,0 +1,100 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from settings import VAULT_CACHE_MAX_SIZE, VAULT_CACHE_NEGATIVE_TTL, VAULT_CACHE_TTL
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# (db_config, connection_string); None means the UUID has no config in Vault
+TenantConfig = Tuple[Dict[str, Any], str]
+Loader = Callable[[], Awaitable[Optional[TenantConfig]]]
+
+
+class VaultConfigCache:
+    """Async TTL cache of uuid -> (db_config, connection_string).
+
+    - Entries expire after ``ttl`` seconds; unknown UUIDs are cached as misses
+      for ``negative_ttl`` seconds so they do not hammer Vault.
+    - At most ``max_size`` entries are kept, evicting the least recently used.
+    - Concurrent lookups for the same UUID share a single in-flight Vault call.
+    """
+
+    def __init__(
+        self,
+        ttl: float = VAULT_CACHE_TTL,
+        negative_ttl: float = VAULT_CACHE_NEGATIVE_TTL,
+        max_size: int = VAULT_CACHE_MAX_SIZE,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+
+        self._entries: "OrderedDict[str, Tuple[float, Optional[TenantConfig]]]" = OrderedDict()
+        self._flights = SingleFlight("vault")
+        self._hits = 0
+        self._negative_hits = 0
+        self._evictions = 0
+
+    async def get(self, uuid: str, loader: Loader) -> Optional[TenantConfig]:
+        """Return the cached config for a UUID, calling ``loader`` at most once per miss"""
+        cached = self._entries.get(uuid)
+        if cached is not None:
+            expires_at, value = cached
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(uuid)
+                if value is None:
+                    self._negative_hits += 1
+                else:
+                    self._hits += 1
+                return value
+            self._entries.pop(uuid, None)
+
+        return await self._flights.do(uuid, lambda: self._load(uuid, loader))
+
+    async def _load(self, uuid: str, loader: Loader) -> Optional[TenantConfig]:
+        value = await loader()
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl > 0:
+            self._store(uuid, value, ttl)
+        return value
+
+    def _store(self, uuid: str, value: Optional[TenantConfig], ttl: float) -> None:
+        self._entries[uuid] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(uuid)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def put(self, uuid: str, value: Optional[TenantConfig]) -> None:
+        """Seed an entry directly (cache warming)"""
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._store(uuid, value, ttl)
+
+    def invalidate(self, uuid: Optional[str] = None) -> int:
+        """Drop one UUID (or everything when uuid is None); returns entries removed"""
+        if uuid is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        return 1 if self._entries.pop(uuid, None) is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        flights = self._flights.stats()
+        misses, coalesced = flights["executions"], flights["coalesced"]
+        lookups = self._hits + self._negative_hits + misses + coalesced
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "negative_ttl": self.negative_ttl,
+            "hits": self._hits,
+            "negative_hits": self._negative_hits,
+            "misses": misses,
+            "coalesced": coalesced,
+            "evictions": self._evictions,
+            "inflight": flights["inflight"],
+            "hit_ratio": round((self._hits + self._negative_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -1,5 +1,7 @@
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from fastmcp import FastMCP
 from langchain_community.utilities.sql_database import SQLDatabase
 from db_mcp_server import db_mcp
@@ -15,6 +17,7 @@ DB_HOST = os.environ.get('DB_HOST')
 DB_PORT = os.environ.get('DB_PORT')
 DB_NAME = os.environ.get('MYSQL_DATABASE')
 DB_DRIVER = os.environ.get('DB_DRIVER', 'pymysql')
+QUERY_MAX_PARALLEL = int(os.environ.get('QUERY_MAX_PARALLEL', '4'))
 DB_URI = f"mysql+{DB_DRIVER}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 if DB_URI and "mysql" in DB_URI.lower():
@@ -32,36 +35,43 @@ def list_tables() -> str:
     """
     return db.get_table_info()
 
+def _run_statement(i: int, statement: str) -> str:
+    if not re.match(r"^\s*select", statement, re.IGNORECASE):
+        return f"Statement {i+1} refused: Only SELECT allowed"
+    started = time.perf_counter()
+    try:
+        result = db.run(statement)
+        if isinstance(result, str):
+            try:
+                result_str = result.encode('utf-8', errors='replace').decode('utf-8')
+            except:
+                result_str = str(result)
+        else:
+            result_str = str(result)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return f"Query {i+1}: {statement}\nResult: {result_str}\nTime: {elapsed_ms:.1f} ms"
+    except Exception as e:
+        try:
+            error_msg = str(e).encode('utf-8', errors='replace').decode('utf-8')
+        except:
+            error_msg = "Encoding error occurred"
+        return f"Query {i+1} failed: {error_msg}"
+
 @mcp.tool
-def query_sql(sql: str) -> str:
+def query_sql(sql: str, parallel: bool = False) -> str:
     """name:Execute SQL SELECT queries to get specific data
-       description:Execute SQL SELECT queries to get specific data
+       description:Execute SQL SELECT queries to get specific data.
+       Set parallel=true to run independent SELECT statements concurrently.
     """
     statements = [stmt.strip() for stmt in sql.split(';') if stmt.strip()]
     if not statements:
         return "No valid SQL statements found"
-    
-    results = []
-    for i, statement in enumerate(statements):
-        if not re.match(r"^\s*select", statement, re.IGNORECASE):
-            results.append(f"Statement {i+1} refused: Only SELECT allowed")
-            continue
-        try:
-            result = db.run(statement)
-            if isinstance(result, str):
-                try:
-                    result_str = result.encode('utf-8', errors='replace').decode('utf-8')
-                except:
-                    result_str = str(result)
-            else:
-                result_str = str(result)
-            results.append(f"Query {i+1}: {statement}\nResult: {result_str}")
-        except Exception as e:
-            try:
-                error_msg = str(e).encode('utf-8', errors='replace').decode('utf-8')
-            except:
-                error_msg = "Encoding error occurred"
-            results.append(f"Query {i+1} failed: {error_msg}")
+
+    if parallel and len(statements) > 1:
+        # each db.run checks out its own pooled connection; map keeps the original order
+        with ThreadPoolExecutor(max_workers=min(QUERY_MAX_PARALLEL, len(statements))) as pool:
+            results = list(pool.map(_run_statement, range(len(statements)), statements))
+    else:
+        results = [_run_statement(i, statement) for i, statement in enumerate(statements)]
     
     return "\n\n".join(results)
-
@@ -1,18 +1,28 @@
 from __future__ import annotations
 
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from functools import lru_cache
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 import hvac
 from fastapi import Depends, FastAPI, HTTPException, Query
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 import dotenv
+import requests
 
 
 dotenv.load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables.
@@ -26,6 +36,12 @@ class Settings(BaseSettings):
     VAULT_USE_USER_BASE: If true, treat each user's id as the base path,
                          storing at "{user_id}/{name}". If false, use
                          "{VAULT_BASE_PATH}/{user_id}/{name}".
+    VAULT_PARALLELISM: Max concurrent Vault calls for listing and reading
+                       secrets (default: 8).
+    VAULT_TOKEN_RENEW_INTERVAL: Seconds between background renewals of a
+                                renewable token (default: 300; 0 disables).
+    VAULT_BATCH_MAX_ITEMS: Max (user_id, name) pairs per POST /secrets/batch
+                           (default: 100).
     """
 
     vault_addr: str = Field(default_factory=lambda: os.getenv("VAULT_ADDR", "http://127.0.0.1:8200"))
@@ -36,6 +52,11 @@ class Settings(BaseSettings):
         default_factory=lambda: os.getenv("VAULT_USE_USER_BASE", "true").lower()
         in ("1", "true", "yes", "y")
     )
+    vault_parallelism: int = Field(default_factory=lambda: int(os.getenv("VAULT_PARALLELISM", "8")))
+    token_renew_interval: float = Field(
+        default_factory=lambda: float(os.getenv("VAULT_TOKEN_RENEW_INTERVAL", "300"))
+    )
+    batch_max_items: int = Field(default_factory=lambda: int(os.getenv("VAULT_BATCH_MAX_ITEMS", "100")))
 
 
 @lru_cache()
@@ -46,11 +67,104 @@ def get_settings() -> Settings:
     return settings
 
 
-def get_vault_client(settings: Settings = Depends(get_settings)) -> hvac.Client:
-    client = hvac.Client(url=settings.vault_addr, token=settings.vault_token)
-    if not client.is_authenticated():
-        raise RuntimeError("Failed to authenticate to Vault")
-    return client
+class VaultClientManager:
+    """One authenticated hvac client shared by all requests.
+
+    The token is checked once, when the client is built, instead of on every
+    request. A background thread renews renewable tokens every
+    ``token_renew_interval`` seconds; if the token stops working the client
+    is dropped and rebuilt (and re-checked) on the next request.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._client: Optional[hvac.Client] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+
+    def client(self) -> hvac.Client:
+        client = self._client
+        if client is not None:
+            return client
+        with self._lock:
+            if self._client is None:
+                self._client = self._connect()
+                self._start_renewer()
+            return self._client
+
+    def _connect(self) -> hvac.Client:
+        # pool sized for the concurrent list/read calls of one request
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(self.settings.vault_parallelism, 1))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        client = hvac.Client(url=self.settings.vault_addr, token=self.settings.vault_token, session=session)
+        if not client.is_authenticated():
+            raise RuntimeError("Failed to authenticate to Vault")
+        return client
+
+    def _start_renewer(self) -> None:
+        if self.settings.token_renew_interval <= 0 or self._renewer is not None:
+            return
+        self._renewer = threading.Thread(target=self._renew_loop, name="vault-token-renew", daemon=True)
+        self._renewer.start()
+
+    def _renew_loop(self) -> None:
+        while not self._stop.wait(self.settings.token_renew_interval):
+            try:
+                self.renew()
+            except Exception as e:
+                logger.warning(f"Vault token renewal failed: {e}")
+
+    def renew(self) -> None:
+        """Renew the token if it is renewable (dev root tokens never expire)"""
+        client = self._client
+        if client is None:
+            return
+        try:
+            token = client.auth.token.lookup_self().get("data", {})
+        except hvac.exceptions.Forbidden:
+            logger.warning("Vault token is no longer valid; reconnecting on next request")
+            self.invalidate()
+            return
+        if token.get("renewable") and token.get("ttl"):
+            client.auth.token.renew_self()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._client = None
+
+    def close(self) -> None:
+        self._stop.set()
+        client = self._client
+        self._client = None
+        if client is not None:
+            client.adapter.close()
+
+
+@lru_cache()
+def get_client_manager() -> VaultClientManager:
+    return VaultClientManager(get_settings())
+
+
+@lru_cache()
+def get_executor() -> ThreadPoolExecutor:
+    """Shared pool bounding concurrent Vault calls across requests"""
+    return ThreadPoolExecutor(
+        max_workers=max(get_settings().vault_parallelism, 1), thread_name_prefix="vault-kv"
+    )
+
+
+def get_vault_client(manager: VaultClientManager = Depends(get_client_manager)) -> hvac.Client:
+    return manager.client()
+
+
+def _map(fn: Callable[[T], R], items: List[T]) -> List[R]:
+    """``fn`` over ``items`` on the shared pool, results in input order"""
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    return list(get_executor().map(fn, items))
 
 
 class SecretCreate(BaseModel):
@@ -73,7 +187,47 @@ class SecretInfo(BaseModel):
     data: Optional[Dict[str, Any]] = None
 
 
-app = FastAPI(title="Vault Credentials Service", version="0.1.0")
+class SecretRef(BaseModel):
+    """One (user_id, name) pair of a batch read."""
+
+    user_id: str = Field(..., min_length=1, max_length=256)
+    name: str = Field(..., min_length=1, max_length=128)
+
+
+class SecretBatchRequest(BaseModel):
+    """Model for reading many secrets at once."""
+
+    items: List[SecretRef]
+
+
+class SecretBatchItem(BaseModel):
+    """Result of one batch item: the secret, or the error reading it."""
+
+    user_id: str
+    name: str
+    status_code: int
+    secret: Optional[SecretInfo] = None
+    error: Optional[str] = None
+
+
+class SecretBatchResponse(BaseModel):
+    """Per-item results, in request order."""
+
+    results: List[SecretBatchItem]
+    found: int
+    failed: int
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if get_client_manager.cache_info().currsize:
+        get_client_manager().close()
+    if get_executor.cache_info().currsize:
+        get_executor().shutdown(wait=False)
+
+
+app = FastAPI(title="Vault Credentials Service", version="0.1.0", lifespan=lifespan)
 
 
 def _credential_path(user_id: str, name: str, settings: Settings) -> str:
@@ -85,32 +239,46 @@ def _credential_path(user_id: str, name: str, settings: Settings) -> str:
 def _list_recursive_kv2(
     client: hvac.Client, mount: str, base_path: str
 ) -> List[str]:
-    """Recursively list all leaf paths under a KV v2 mount/path."""
+    """Recursively list all leaf paths under a KV v2 mount/path.
 
-    results: List[str] = []
+    Each level of the tree is listed concurrently; the result keeps the
+    depth-first order of a serial walk.
+    """
 
-    def walk(prefix: str) -> None:
+    def list_keys(prefix: str) -> List[str]:
         try:
             resp = client.secrets.kv.v2.list_secrets(
                 mount_point=mount, path=prefix
             )
         except (hvac.exceptions.InvalidPath, hvac.exceptions.Forbidden):
-            return
+            return []
         except Exception:
             # Handle any other hvac exceptions gracefully
-            return
+            return []
+        return resp.get("data", {}).get("keys", [])
 
-        keys = resp.get("data", {}).get("keys", [])
-        for key in keys:
+    if base_path:
+        root = base_path if base_path.endswith("/") else base_path + "/"
+    else:
+        root = ""
+
+    listings: Dict[str, List[str]] = {}
+    level = [root]
+    while level:
+        for prefix, keys in zip(level, _map(list_keys, level)):
+            listings[prefix] = keys
+        level = [prefix + key for prefix in level for key in listings[prefix] if key.endswith("/")]
+
+    results: List[str] = []
+
+    def flatten(prefix: str) -> None:
+        for key in listings[prefix]:
             if key.endswith("/"):
-                walk(prefix + key)
+                flatten(prefix + key)
             else:
                 results.append(prefix + key)
 
-    if base_path:
-        walk(base_path if base_path.endswith("/") else base_path + "/")
-    else:
-        walk("")
+    flatten(root)
     return results
 
 
@@ -169,18 +337,17 @@ def list_secrets(
         base = settings.vault_base_path if not settings.use_user_as_base else ""
 
     paths = _list_recursive_kv2(client, settings.vault_mount, base)
-    infos: List[SecretInfo] = []
-    for path in paths:
+
+    def read(path: str) -> Optional[SecretInfo]:
         try:
-            infos.append(
-                _read_secret_info(
-                    client, settings.vault_mount, path, include_values
-                )
+            return _read_secret_info(
+                client, settings.vault_mount, path, include_values
             )
         except HTTPException:
             # Skip secrets that can't be read
-            continue
-    return infos
+            return None
+
+    return [info for info in _map(read, paths) if info is not None]
 
 
 @app.get("/secrets/{user_id}/{name}", response_model=SecretInfo)
@@ -199,6 +366,45 @@ def get_secret(
     )
 
 
+@app.post("/secrets/batch", response_model=SecretBatchResponse)
+def get_secrets_batch(
+    payload: SecretBatchRequest,
+    include_values: bool = Query(
+        True, description="Include secret values in response"
+    ),
+    client: hvac.Client = Depends(get_vault_client),
+    settings: Settings = Depends(get_settings),
+) -> SecretBatchResponse:
+    if len(payload.items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many items: {len(payload.items)} > {settings.batch_max_items}",
+        )
+
+    # duplicate pairs are read once
+    refs = list(dict.fromkeys((item.user_id, item.name) for item in payload.items))
+
+    def read(ref: Tuple[str, str]) -> SecretBatchItem:
+        user_id, name = ref
+        path = _credential_path(user_id=user_id, name=name, settings=settings)
+        try:
+            info = _read_secret_info(
+                client, settings.vault_mount, path, include_values
+            )
+        except HTTPException as e:
+            return SecretBatchItem(
+                user_id=user_id, name=name, status_code=e.status_code, error=e.detail
+            )
+        return SecretBatchItem(user_id=user_id, name=name, status_code=200, secret=info)
+
+    read_by_ref = dict(zip(refs, _map(read, refs)))
+    results = [read_by_ref[(item.user_id, item.name)] for item in payload.items]
+    found = sum(1 for result in results if result.secret is not None)
+    return SecretBatchResponse(
+        results=results, found=found, failed=len(results) - found
+    )
+
+
 @app.post("/secrets", response_model=SecretInfo, status_code=201)
 def create_secret(
     payload: SecretCreate,